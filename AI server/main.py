@@ -1,22 +1,51 @@
 import os
 import logging
-from typing import Dict, List, Optional, Union
+import hashlib
+from collections import OrderedDict
+from string import Formatter
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 from enum import Enum
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 import asyncio
 import aiohttp
 import json
+import re
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import msgspec
+import msgspec.structs
+import orjson
 
 # Add this import for loading .env files
 from dotenv import load_dotenv
 
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 import uvicorn
-from groq import Groq
+from groq import APIConnectionError, APIStatusError, APITimeoutError, AsyncGroq, Groq
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder
+
+# Optional dependencies for the semantic cache
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    np = None
+    SentenceTransformer = None
+
+# Optional brotli response compression; gzip is used when it is not installed
+try:
+    from brotli_asgi import BrotliResponder, Mode as BrotliMode
+except ImportError:
+    BrotliResponder = None
+    BrotliMode = None
 
 # Load environment variables from .env file
 load_dotenv()
@@ -25,11 +54,39 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Manage application startup and shutdown"""
+    # A single consumer writes operation logs off the request path. The queue is bounded so a
+    # stalled writer can never grow memory without limit, and is created here so it belongs to this loop
+    log_queue: asyncio.Queue = asyncio.Queue(maxsize=OPERATION_LOG_QUEUE_SIZE)
+    app.state.operation_log_queue = log_queue
+    log_writer = asyncio.create_task(write_operation_logs(log_queue))
+    # The Groq client and AI service are owned by the app for its whole lifetime
+    groq_client = create_groq_client(GROQ_API_KEY) if GROQ_API_KEY else None
+    app.state.ai_service = GroqAIService(groq_client) if groq_client else None
+    # Resolve DNS and open the Groq connection before the first request needs it
+    if groq_client:
+        try:
+            await groq_client.models.list(timeout=GROQ_CONNECT_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Groq connection warm-up failed: {str(e)}")
+    yield
+    # Stop queueing, then let the writer flush what is left and exit
+    app.state.operation_log_queue = None
+    await log_queue.put(None)
+    await log_writer
+    # Close the shared Groq connection pool on shutdown
+    if groq_client:
+        await groq_client.close()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Groq AI Content & Rephrase Service",
     description="AI-powered text rephrasing and content generation service using Groq",
-    version="1.1.0"
+    version="1.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -41,6 +98,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compressing these would buffer the response and defeat streaming
+STREAMING_MEDIA_TYPES = ("text/event-stream", "application/x-ndjson")
+
+class CompressionMiddleware:
+    """
+    Brotli- or gzip-compress large responses, leaving streaming responses untouched
+    
+    Brotli is used when brotli-asgi is installed and the client accepts it, gzip otherwise.
+    Whether to compress is decided from the Content-Type of the response itself, so every
+    route that streams is covered, whatever its path.
+    """
+    
+    def __init__(self, app, minimum_size: int = 1000):
+        self.app = app
+        self.minimum_size = minimum_size
+    
+    def _responder(self, scope, app):
+        accept_encoding = Headers(scope=scope).get("Accept-Encoding", "")
+        if BrotliResponder is not None and "br" in accept_encoding:
+            return BrotliResponder(
+                app,
+                quality=4,
+                mode=BrotliMode.text,
+                lgwin=22,
+                lgblock=0,
+                minimum_size=self.minimum_size
+            )
+        if "gzip" in accept_encoding:
+            return GZipResponder(app, self.minimum_size, compresslevel=5)
+        return None
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def content_type_switch(scope, receive, compressing_send):
+            target = None
+            
+            async def switched_send(message):
+                nonlocal target
+                # The first message is http.response.start, which carries the headers
+                if target is None:
+                    content_type = Headers(raw=message["headers"]).get("content-type", "")
+                    target = send if content_type.startswith(STREAMING_MEDIA_TYPES) else compressing_send
+                await target(message)
+            
+            await self.app(scope, receive, switched_send)
+        
+        responder = self._responder(scope, content_type_switch)
+        if responder is None:
+            await self.app(scope, receive, send)
+            return
+        await responder(scope, receive, send)
+
+# Configure response compression
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
+
 # Security
 security = HTTPBearer()
 
@@ -49,8 +164,67 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     logger.warning("GROQ_API_KEY not found in environment variables or .env file")
 
-# Initialize Groq client
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+# Groq HTTP client configuration
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))
+# Hard cap on a whole completion call, in case a socket misbehaves despite httpx's timeouts
+GROQ_CALL_TIMEOUT = GROQ_TIMEOUT + 5
+# Streamed bodies can trickle for a long time, so they get their own overall deadline
+GROQ_STREAM_TIMEOUT = float(os.getenv("GROQ_STREAM_TIMEOUT", "120"))
+GROQ_CONNECT_TIMEOUT = 5.0
+GROQ_WRITE_TIMEOUT = 10.0
+GROQ_POOL_TIMEOUT = 5.0
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "200"))
+GROQ_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "100"))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60"))
+# Admission control to stay within Groq's rate limits. GROQ_TOKENS_PER_MINUTE is the budget of the
+# whole Groq account and is split evenly across worker processes; GROQ_CONCURRENCY and
+# GROQ_MAX_PENDING apply per worker process
+GROQ_WORKER_COUNT = max(1, int(os.getenv("GROQ_WORKER_COUNT", "1")))  # Set by `--mode server`
+GROQ_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", "8"))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "0"))  # 0 disables the token budget
+if GROQ_TOKENS_PER_MINUTE:
+    GROQ_TOKENS_PER_MINUTE = max(1, GROQ_TOKENS_PER_MINUTE // GROQ_WORKER_COUNT)
+GROQ_MAX_PENDING = int(os.getenv("GROQ_MAX_PENDING", "100"))
+
+# Fail fast once Groq keeps failing rather than waiting out every timeout
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", "30"))
+RETRY_AFTER_COOLDOWN = {"Retry-After": str(int(CIRCUIT_BREAKER_COOLDOWN))}
+
+def create_groq_client(api_key: str) -> AsyncGroq:
+    """Create an async Groq client backed by a long-lived httpx connection pool"""
+    # Fail fast on connect and pool waits; only reads may take as long as a generation
+    timeout = httpx.Timeout(
+        GROQ_TIMEOUT,
+        connect=GROQ_CONNECT_TIMEOUT,
+        write=GROQ_WRITE_TIMEOUT,
+        pool=GROQ_POOL_TIMEOUT
+    )
+    # HTTP/2 multiplexes concurrent requests over a few kept-alive TLS connections
+    http_client = httpx.AsyncClient(
+        timeout=timeout,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=GROQ_KEEPALIVE_EXPIRY
+        )
+    )
+    return AsyncGroq(api_key=api_key, timeout=timeout, http_client=http_client)
+
+# Response cache configuration
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+# Responses sampled above this temperature are not cached; set to 0.1 to cache only near-deterministic calls
+CACHE_MAX_TEMPERATURE = float(os.getenv("CACHE_MAX_TEMPERATURE", "2.0"))
+# Opt-in: answers number-only variations of confirmed texts without calling the LLM
+TEMPLATE_CACHE_ENABLED = os.getenv("TEMPLATE_CACHE_ENABLED", "false").lower() == "true"
+TEMPLATE_CACHE_CONFIRMATIONS = int(os.getenv("TEMPLATE_CACHE_CONFIRMATIONS", "3"))
+TEMPLATE_CACHE_VERIFY_EVERY = int(os.getenv("TEMPLATE_CACHE_VERIFY_EVERY", "20"))
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
 
 # Enums and Models
 class RephraseStyle(str, Enum):
@@ -79,14 +253,40 @@ class ContentLength(str, Enum):
     MEDIUM = "medium"
     LONG = "long"
 
+# Content types that operate on caller-supplied context
+CONTEXT_REQUIRED_TYPES = frozenset({
+    ContentGenerationType.CONTINUE,
+    ContentGenerationType.EXPAND,
+    ContentGenerationType.SUMMARIZE
+})
+
+# Option values accepted by the CLI commands, with their display lists
+REPHRASE_STYLE_VALUES = frozenset(style.value for style in RephraseStyle)
+REPHRASE_STYLE_LIST = ", ".join(style.value for style in RephraseStyle)
+CONTENT_TYPE_VALUES = frozenset(content_type.value for content_type in ContentGenerationType)
+CONTENT_TYPE_LIST = ", ".join(content_type.value for content_type in ContentGenerationType)
+
 class RephraseRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     text: str = Field(..., min_length=1, max_length=5000, description="Text to rephrase")
     style: RephraseStyle = Field(default=RephraseStyle.FORMAL, description="Rephrasing style")
     preserve_meaning: bool = Field(default=True, description="Whether to preserve original meaning")
     max_tokens: int = Field(default=1000, ge=100, le=2000, description="Maximum tokens for response")
     temperature: float = Field(default=0.7, ge=0.0, le=2.0, description="Temperature for AI generation")
+    
+    @field_validator("text")
+    @classmethod
+    def check_text_not_empty(cls, value: str) -> str:
+        """Reject whitespace-only text while parsing, before any handler runs"""
+        value = value.strip()
+        if not value:
+            raise ValueError("Text cannot be empty")
+        return value
 
 class ContentGenerationRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     prompt: str = Field(..., min_length=1, max_length=2000, description="Content generation prompt")
     context: Optional[str] = Field(default=None, max_length=5000, description="Context text for content generation")
     type: ContentGenerationType = Field(default=ContentGenerationType.NEW, description="Type of content generation")
@@ -94,8 +294,27 @@ class ContentGenerationRequest(BaseModel):
     length: ContentLength = Field(default=ContentLength.MEDIUM, description="Desired length of content")
     max_tokens: int = Field(default=800, ge=100, le=2000, description="Maximum tokens for response")
     temperature: float = Field(default=0.7, ge=0.0, le=1.5, description="Temperature for AI generation")
+    stream: bool = Field(default=False, description="Stream the content as Server-Sent Events")
+    
+    @field_validator("prompt")
+    @classmethod
+    def check_prompt_not_empty(cls, value: str) -> str:
+        """Reject whitespace-only prompts while parsing, before any handler runs"""
+        value = value.strip()
+        if not value:
+            raise ValueError("Prompt cannot be empty")
+        return value
+    
+    @model_validator(mode="after")
+    def check_context_required(self) -> "ContentGenerationRequest":
+        """Require context for content types that build on existing text"""
+        if self.type in CONTEXT_REQUIRED_TYPES and not (self.context and self.context.strip()):
+            raise ValueError(f"Context is required for {self.type.value} content generation")
+        return self
 
 class RephraseResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     original_text: str
     rephrased_text: str
     style: RephraseStyle
@@ -104,6 +323,8 @@ class RephraseResponse(BaseModel):
     confidence: Optional[float] = None
 
 class ContentGenerationResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     generated_content: str
     prompt: str
     type: ContentGenerationType
@@ -112,22 +333,90 @@ class ContentGenerationResponse(BaseModel):
     processing_time: float
     tokens_used: Optional[int] = None
 
+# Internal service results
+class RephraseResult(msgspec.Struct, frozen=True):
+    rephrased_text: str
+    processing_time: float
+    model_used: str
+    tokens_used: Optional[int] = None
+    cached: bool = False
+
+class ContentResult(msgspec.Struct, frozen=True):
+    generated_content: str
+    processing_time: float
+    model_used: str
+    content_type: ContentGenerationType
+    tone: ContentTone
+    length: ContentLength
+    tokens_used: Optional[int] = None
+    cached: bool = False
+
+# Server-Sent Event payloads, encoded by one shared encoder for every frame
+class StreamDelta(msgspec.Struct):
+    delta: str
+
+class StreamDone(msgspec.Struct):
+    tokens_used: int
+    processing_time: float
+
+class StreamError(msgspec.Struct):
+    error: str
+
+STREAM_ENCODER = msgspec.json.Encoder()
+
 class HealthResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     status: str
-    timestamp: datetime
+    timestamp: str
     groq_available: bool
+    circuit_state: Optional[str] = None
     version: str = "1.1.0"
 
 class ErrorResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     error: str
     message: str
     timestamp: datetime
 
+def compile_template(template: str) -> Callable[..., str]:
+    """
+    Parse a str.format template once into a function that fills it by concatenation
+    
+    Only plain named fields with string values are supported, which is all the prompts use.
+    """
+    literals = [""]
+    names = []
+    for literal, name, spec, conversion in Formatter().parse(template):
+        literals[-1] += literal
+        if name is None:
+            continue
+        if spec or conversion or not name.isidentifier():
+            raise ValueError(f"Unsupported template field: {name!r}")
+        names.append(name)
+        literals.append("")
+    
+    head = literals[0]
+    parts = tuple(zip(names, literals[1:]))
+    
+    def render(**values: str) -> str:
+        text = head
+        for name, literal in parts:
+            text += values[name] + literal
+        return text
+    
+    return render
+
 @dataclass
 class StylePrompt:
     system_prompt: str
     user_template: str
     temperature: float
+    render_user: Callable[..., str] = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self.render_user = compile_template(self.user_template)
 
 @dataclass
 class ContentPrompt:
@@ -146,7 +435,7 @@ STYLE_PROMPTS: Dict[RephraseStyle, StylePrompt] = {
             "enhancing clarity, precision, and formality. Use appropriate business vocabulary and eliminate "
             "colloquialisms. Structure sentences for maximum clarity and impact."
         ),
-        user_template="Transform this text into formal, professional language:\n\n\"{text}\"\n\nEnsure the tone is appropriate for business or academic contexts while preserving all key information.",
+        user_template="Transform the text below into formal, professional language. Ensure the tone is appropriate for business or academic contexts while preserving all key information.\n\nText:\n\"{text}\"",
         temperature=0.4
     ),
     RephraseStyle.CASUAL: StylePrompt(
@@ -156,7 +445,7 @@ STYLE_PROMPTS: Dict[RephraseStyle, StylePrompt] = {
             "Use contractions, simple vocabulary, and a warm tone while maintaining the original meaning. "
             "Make it sound like something you'd say to a friend or colleague in an informal setting."
         ),
-        user_template="Rewrite this text in a casual, friendly conversational style:\n\n\"{text}\"\n\nMake it sound natural and approachable, like you're talking to a friend.",
+        user_template="Rewrite the text below in a casual, friendly conversational style. Make it sound natural and approachable, like you're talking to a friend.\n\nText:\n\"{text}\"",
         temperature=0.7
     ),
     RephraseStyle.CREATIVE: StylePrompt(
@@ -166,7 +455,7 @@ STYLE_PROMPTS: Dict[RephraseStyle, StylePrompt] = {
             "Capture the reader's attention while preserving the core message. Employ literary techniques "
             "like alliteration, rhythm, and descriptive language to make the text more captivating and memorable."
         ),
-        user_template="Transform this text into creative, engaging content that captures attention:\n\n\"{text}\"\n\nUse vivid language, interesting expressions, and creative techniques while maintaining the core message.",
+        user_template="Transform the text below into creative, engaging content that captures attention. Use vivid language, interesting expressions, and creative techniques while maintaining the core message.\n\nText:\n\"{text}\"",
         temperature=0.9
     ),
     RephraseStyle.CONCISE: StylePrompt(
@@ -176,11 +465,29 @@ STYLE_PROMPTS: Dict[RephraseStyle, StylePrompt] = {
             "Use active voice, strong verbs, and precise nouns. Combine related ideas efficiently and "
             "eliminate filler words while ensuring all essential information remains intact and clear."
         ),
-        user_template="Make this text as concise and clear as possible while retaining all important information:\n\n\"{text}\"\n\nEliminate redundancy and wordiness, but keep all key points.",
+        user_template="Make the text below as concise and clear as possible while retaining all important information. Eliminate redundancy and wordiness, but keep all key points.\n\nText:\n\"{text}\"",
         temperature=0.2
     )
 }
 
+# Batched rephrasing: one completion returns every rephrased text of a style
+BATCH_REPHRASE_TEMPLATE = (
+    "Rephrase each numbered text below in a {style} style, treating every text independently. "
+    "Return ONLY a JSON object of the form {{\"results\": [\"...\", \"...\"]}} containing exactly {count} "
+    "rephrased strings in the same order as the texts.\n\n"
+    "Texts:\n{texts}"
+)
+BATCH_MAX_TOKENS = 8000
+BATCH_MAX_TEXTS = 20
+# Rephrased output runs about as long as its input; keep half the budget spare for longer styles and JSON
+BATCH_MAX_INPUT_TOKENS = BATCH_MAX_TOKENS // 2
+
+# Compiled batch templates with the style already applied; only count and texts remain
+BATCH_TEMPLATE_CACHE: Dict[RephraseStyle, Callable[..., str]] = {
+    style: compile_template(BATCH_REPHRASE_TEMPLATE.replace("{style}", style.value))
+    for style in RephraseStyle
+}
+
 # Enhanced Content generation configurations
 CONTENT_PROMPTS: Dict[ContentGenerationType, ContentPrompt] = {
     ContentGenerationType.NEW: ContentPrompt(
@@ -190,7 +497,7 @@ CONTENT_PROMPTS: Dict[ContentGenerationType, ContentPrompt] = {
             "Use relevant examples, concrete details, and logical flow. Adapt your writing style precisely to match "
             "the requested tone and length requirements. Ensure your content is informative, actionable, and memorable."
         ),
-        user_template="Create original content about: {prompt}\n\nRequired tone: {tone}\nTarget length: {length}\n\nMake it engaging, well-structured, and valuable to readers.",
+        user_template="Create original content about the topic below. Make it engaging, well-structured, and valuable to readers.\n\nRequired tone: {tone}\nTarget length: {length}\n\nTopic: {prompt}",
         temperature=0.8
     ),
     ContentGenerationType.CONTINUE: ContentPrompt(
@@ -200,7 +507,7 @@ CONTENT_PROMPTS: Dict[ContentGenerationType, ContentPrompt] = {
             "while advancing the narrative or argument naturally. Maintain consistency in perspective, tense, and voice. "
             "Create smooth transitions and logical progression from the existing content. Avoid repetition of already-covered points."
         ),
-        user_template="Continue writing naturally from this text:\n\n\"{context}\"\n\nSpecific instructions: {prompt}\nMaintain this tone: {tone}\nTarget length for continuation: {length}\n\nEnsure seamless flow and consistency with the existing content.",
+        user_template="Continue writing naturally from the text below. Ensure seamless flow and consistency with the existing content.\n\nMaintain this tone: {tone}\nTarget length for continuation: {length}\n\nSpecific instructions: {prompt}\n\nText to continue:\n\"{context}\"",
         temperature=0.6
     ),
     ContentGenerationType.EXPAND: ContentPrompt(
@@ -210,7 +517,7 @@ CONTENT_PROMPTS: Dict[ContentGenerationType, ContentPrompt] = {
             "practical applications, and additional context. Maintain the original structure and key points while "
             "significantly enhancing value. Add subsections, bullet points, or numbered lists where appropriate for clarity."
         ),
-        user_template="Expand and elaborate on this content with additional depth and detail:\n\n\"{context}\"\n\nSpecific focus areas: {prompt}\nTone to maintain: {tone}\nDesired expanded length: {length}\n\nAdd examples, explanations, and practical insights while preserving the original message.",
+        user_template="Expand and elaborate on the content below with additional depth and detail. Add examples, explanations, and practical insights while preserving the original message.\n\nTone to maintain: {tone}\nDesired expanded length: {length}\n\nSpecific focus areas: {prompt}\n\nContent to expand:\n\"{context}\"",
         temperature=0.7
     ),
     ContentGenerationType.BRAINSTORM: ContentPrompt(
@@ -221,7 +528,7 @@ CONTENT_PROMPTS: Dict[ContentGenerationType, ContentPrompt] = {
             "For each idea, provide a brief explanation of its potential value or application. "
             "Encourage further exploration with thought-provoking questions or next steps."
         ),
-        user_template="Generate diverse brainstorming ideas for: {prompt}\n\nAdditional context: {context}\nApproach with this tone: {tone}\nNumber of ideas (based on {length}): Provide comprehensive brainstorming\n\nOrganize ideas into categories and include brief explanations for each suggestion.",
+        user_template="Generate diverse brainstorming ideas for the topic below. Organize ideas into categories and include brief explanations for each suggestion.\n\nApproach with this tone: {tone}\nNumber of ideas (based on {length}): Provide comprehensive brainstorming\n\nTopic: {prompt}\nAdditional context: {context}",
         temperature=0.95
     ),
     ContentGenerationType.OUTLINE: ContentPrompt(
@@ -232,7 +539,7 @@ CONTENT_PROMPTS: Dict[ContentGenerationType, ContentPrompt] = {
             "Ensure logical flow and comprehensive coverage of the topic. "
             "Use proper formatting with clear hierarchy (I, II, III / A, B, C / 1, 2, 3)."
         ),
-        user_template="Create a detailed outline for: {prompt}\n\nRelevant context: {context}\nIntended tone: {tone}\nOutline detail level ({length}): Provide appropriate depth\n\nStructure with main sections, subsections, and brief descriptions of what each part should cover.",
+        user_template="Create a detailed outline for the topic below. Structure with main sections, subsections, and brief descriptions of what each part should cover.\n\nIntended tone: {tone}\nOutline detail level ({length}): Provide appropriate depth\n\nTopic: {prompt}\nRelevant context: {context}",
         temperature=0.5
     ),
     ContentGenerationType.SUMMARIZE: ContentPrompt(
@@ -243,7 +550,7 @@ CONTENT_PROMPTS: Dict[ContentGenerationType, ContentPrompt] = {
             "Maintain the original meaning while making the content more accessible and digestible. "
             "Highlight any actionable items, conclusions, or recommendations."
         ),
-        user_template="Create a comprehensive summary of this content:\n\n\"{context}\"\n\nSpecific focus or angle: {prompt}\nSummary tone: {tone}\nSummary length: {length}\n\nCapture all key points, main insights, and important details while making it clear and well-organized.",
+        user_template="Create a comprehensive summary of the content below. Capture all key points, main insights, and important details while making it clear and well-organized.\n\nSummary tone: {tone}\nSummary length: {length}\n\nSpecific focus or angle: {prompt}\n\nContent to summarize:\n\"{context}\"",
         temperature=0.4
     ),
 }
@@ -298,20 +605,611 @@ LENGTH_GUIDELINES: Dict[ContentLength, Dict[str, Union[int, str]]] = {
         "detail_level": "In-depth analysis with multiple examples, subsections, and comprehensive coverage"
     }
 }
+
+CONTENT_MAX_TOKENS = 2000  # Hard limit for content generation
+
+@dataclass(frozen=True)
+class SpecializedPrompt:
+    system_prompt: str
+    render_user: Callable[..., str]
+    temperature: float
+    max_tokens: int
+
+def build_prompt_template(
+    content_type: ContentGenerationType,
+    tone: ContentTone,
+    length: ContentLength
+) -> SpecializedPrompt:
+    """Specialize a content prompt for one (type, tone, length); only prompt and context remain to fill"""
+    content_config = CONTENT_PROMPTS[content_type]
+    length_info = LENGTH_GUIDELINES[length]
+    return SpecializedPrompt(
+        system_prompt=(
+            f"{content_config.system_prompt}\n\n{TONE_MODIFIERS[tone]}"
+            f"\n\nTarget length: {length_info['description']}"
+        ),
+        render_user=compile_template(
+            content_config.user_template
+                .replace("{tone}", tone.value)
+                .replace(
+                    "{length}",
+                    length_info['brainstorm_items']
+                    if content_type == ContentGenerationType.BRAINSTORM
+                    else length.value
+                )
+        ),
+        temperature=content_config.temperature,
+        max_tokens=min(length_info['tokens'], CONTENT_MAX_TOKENS)
+    )
+
+# Every (content type, tone, length) combination, specialized once at import time
+PROMPT_CACHE: Dict[Tuple[ContentGenerationType, ContentTone, ContentLength], SpecializedPrompt] = {
+    (content_type, tone, length): build_prompt_template(content_type, tone, length)
+    for content_type in ContentGenerationType
+    for tone in ContentTone
+    for length in ContentLength
+}
+
+# Cache Classes
+class ResponseCache:
+    """In-process LRU cache with per-entry expiry for AI responses"""
+    
+    def __init__(self, maxsize: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a stable cache key from the canonicalized request parts"""
+        payload = json.dumps(parts, ensure_ascii=False, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def get(self, key: Optional[str]) -> Optional[Any]:
+        """Return the cached value, or None if missing, expired or the request is uncacheable"""
+        if key is None:
+            return None
+        
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: Optional[str], value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        if key is None:
+            return
+        
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+@dataclass
+class TemplateEntry:
+    template: str
+    expires_at: float
+    confirmations: int = 1
+    hits: int = 0
+
+class TemplateCache:
+    """
+    Reuses confirmed rephrasings for texts that differ only in their numbers
+    
+    Texts are fingerprinted by replacing numbers with placeholders. Once the model has
+    returned the same output template for a fingerprint enough times, matching texts are
+    answered by substituting their own numbers, with a periodic model call to re-verify.
+    Templates expire after the same TTL as cached responses.
+    """
+    
+    NUMBER_PATTERN = re.compile(r"\d+(?:[.,:]\d+)*")
+    
+    def __init__(
+        self,
+        confirmations: int = TEMPLATE_CACHE_CONFIRMATIONS,
+        verify_every: int = TEMPLATE_CACHE_VERIFY_EVERY,
+        maxsize: int = CACHE_MAX_SIZE,
+        ttl: float = CACHE_TTL
+    ):
+        self.confirmations = confirmations
+        self.verify_every = verify_every
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, TemplateEntry]" = OrderedDict()
+    
+    @classmethod
+    def fingerprint(cls, text: str) -> Tuple[str, List[str]]:
+        """Split text into its number-free skeleton and the numbers it contains"""
+        return cls.NUMBER_PATTERN.sub("#", text.strip()), cls.NUMBER_PATTERN.findall(text)
+    
+    def lookup(self, key: str, numbers: List[str]) -> Optional[str]:
+        """Render a confirmed template, or return None when the model should be asked"""
+        entry = self._live_entry(key)
+        if entry is None or entry.confirmations < self.confirmations:
+            return None
+        
+        entry.hits += 1
+        if entry.hits % self.verify_every == 0:
+            return None
+        
+        self._entries.move_to_end(key)
+        return entry.template.format(*numbers)
+    
+    def record(self, key: str, numbers: List[str], output: str):
+        """Confirm or replace the template for a fingerprint from a model output"""
+        template = self._build_template(numbers, output)
+        if template is None:
+            self._entries.pop(key, None)
+            return
+        
+        entry = self._live_entry(key)
+        expires_at = time.monotonic() + self.ttl
+        if entry is not None and entry.template == template:
+            entry.confirmations += 1
+            entry.expires_at = expires_at
+        else:
+            self._entries[key] = TemplateEntry(template=template, expires_at=expires_at)
+        
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def _live_entry(self, key: str) -> Optional[TemplateEntry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+    
+    def _build_template(self, numbers: List[str], output: str) -> Optional[str]:
+        """Turn an output into a format template if each input number appears in it exactly once"""
+        if len(set(numbers)) != len(numbers):
+            return None
+        
+        output_numbers = self.NUMBER_PATTERN.findall(output)
+        if sorted(output_numbers) != sorted(numbers):
+            return None
+        
+        slots = {number: index for index, number in enumerate(numbers)}
+        escaped = output.replace("{", "{{").replace("}", "}}")
+        return self.NUMBER_PATTERN.sub(lambda match: "{" + str(slots[match.group(0)]) + "}", escaped)
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over prompt embeddings for near-duplicate requests
+    
+    Entries are kept in separate buckets per request settings, so a match is only ever
+    returned for a request with the same style, type, tone and length.
+    """
+    
+    def __init__(
+        self,
+        model_name: str = SEMANTIC_CACHE_MODEL,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES
+    ):
+        self.model = SentenceTransformer(model_name)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._buckets: Dict[str, Tuple[Any, List[Any]]] = {}
+    
+    async def embed(self, text: str):
+        """Embed text as a unit vector, off the event loop"""
+        return await asyncio.to_thread(self.model.encode, text, normalize_embeddings=True)
+    
+    def get(self, bucket: str, vector) -> Optional[Any]:
+        """Return the most similar cached value if it clears the similarity threshold"""
+        entry = self._buckets.get(bucket)
+        if entry is None:
+            return None
+        
+        vectors, values = entry
+        scores = vectors @ vector
+        best = int(scores.argmax())
+        return values[best] if scores[best] >= self.threshold else None
+    
+    def set(self, bucket: str, vector, value: Any):
+        vectors, values = self._buckets.get(bucket, (np.empty((0, vector.shape[0]), dtype=vector.dtype), []))
+        vectors = np.vstack([vectors, vector])[-self.max_entries:]
+        values = (values + [value])[-self.max_entries:]
+        self._buckets[bucket] = (vectors, values)
+
+def create_semantic_cache() -> Optional[SemanticCache]:
+    """Build the semantic cache if it is enabled and its dependencies are installed"""
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if SentenceTransformer is None:
+        logger.warning("SEMANTIC_CACHE_ENABLED is set but sentence-transformers is not installed")
+        return None
+    return SemanticCache()
+
+class CircuitBreaker:
+    """
+    Stops calling the upstream API after repeated consecutive failures
+    
+    Opens after `threshold` failures and rejects calls for `cooldown` seconds, then lets a
+    single probe through; a successful probe closes it again.
+    """
+    
+    def __init__(self, threshold: int = CIRCUIT_BREAKER_THRESHOLD, cooldown: float = CIRCUIT_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+    
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open"""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+    
+    def allow(self) -> bool:
+        """Whether a call may go upstream now, reserving the probe when half open"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self._probing:
+            return False
+        self._probing = True
+        return True
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+    
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+    
+    def release_probe(self):
+        """Give back the half-open probe of a call that says nothing about Groq's health, e.g. cancelled or rejected"""
+        self._probing = False
+    
+    @staticmethod
+    def is_upstream_failure(error: Exception) -> bool:
+        """Only connection problems and server errors say anything about Groq's health"""
+        if isinstance(error, APIStatusError):
+            return error.status_code >= 500
+        # Streamed bodies surface transport errors from httpx unwrapped
+        return isinstance(error, (APIConnectionError, httpx.TransportError))
+
+@dataclass
+class TokenReservation:
+    reserved: int
+    used: Optional[int] = None
+    accepted: bool = False
+
+class GroqRateLimiter:
+    """
+    Admission control for Groq calls: a concurrency cap plus a tokens-per-minute budget
+    
+    Each call reserves its expected tokens before it is sent and, once the response reports
+    its usage, refunds what it did not use or is debited what it used beyond the estimate.
+    The budget refills continuously, so callers only wait as long as it takes to recover.
+    Limits are per worker process.
+    """
+    
+    def __init__(
+        self,
+        concurrency: int = GROQ_CONCURRENCY,
+        tokens_per_minute: int = GROQ_TOKENS_PER_MINUTE,
+        max_pending: int = GROQ_MAX_PENDING
+    ):
+        self.tokens_per_minute = tokens_per_minute
+        self.max_pending = max_pending
+        self.pending = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self._tokens = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+    
+    def can_admit(self, calls: int) -> bool:
+        """Whether `calls` more calls fit in the backlog"""
+        return self.pending + calls <= self.max_pending
+    
+    @asynccontextmanager
+    async def acquire(self, expected_tokens: int) -> AsyncIterator[TokenReservation]:
+        """Hold a call slot and token reservation; set `used` on the reservation to refund the rest"""
+        self.pending += 1
+        try:
+            reservation = TokenReservation(reserved=await self._reserve(expected_tokens))
+            try:
+                async with self._semaphore:
+                    yield reservation
+            except BaseException:
+                # A call Groq never accepted is not billed, so its whole reservation goes back;
+                # one that failed part way through keeps its reservation, as Groq bills what it generated
+                if not reservation.accepted:
+                    reservation.used = 0
+                raise
+            finally:
+                if reservation.used is not None:
+                    self._refund(reservation.reserved - reservation.used)
+        finally:
+            self.pending -= 1
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.tokens_per_minute,
+            self._tokens + (now - self._updated_at) * self.tokens_per_minute / 60
+        )
+        self._updated_at = now
+    
+    async def _reserve(self, tokens: int) -> int:
+        if not self.tokens_per_minute:
+            return 0
+        
+        tokens = min(tokens, self.tokens_per_minute)
+        # Waiters queue on the lock, so reservations are granted in arrival order
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) * 60 / self.tokens_per_minute)
+                self._refill()
+            self._tokens -= tokens
+        return tokens
+    
+    def _refund(self, tokens: int):
+        """Return unused reserved tokens, or debit usage beyond the reservation when `tokens` is negative"""
+        if not self.tokens_per_minute or tokens == 0:
+            return
+        
+        self._refill()
+        # Overage may take the bucket below zero; later reservations then wait until it is paid back
+        self._tokens = min(self.tokens_per_minute, self._tokens + tokens)
+
 # Service Classes
+@dataclass
+class StreamUsage:
+    tokens_used: int = 0
+
 class GroqAIService:
     """Main service for handling Groq AI requests"""
     
-    def __init__(self, client: Groq):
+    def __init__(self, client: AsyncGroq):
         self.client = client
         self.model = "llama-3.3-70b-versatile"
+        self.cache = ResponseCache()
+        self.template_cache = TemplateCache() if TEMPLATE_CACHE_ENABLED else None
+        self.semantic_cache = create_semantic_cache()
+        self.breaker = CircuitBreaker()
+        self.limiter = GroqRateLimiter()
+    
+    def raise_if_unavailable(self):
+        """Reject the request straight away while the circuit breaker is open"""
+        if self.breaker.state == "open":
+            raise HTTPException(
+                status_code=503,
+                detail="Upstream temporarily unavailable",
+                headers=RETRY_AFTER_COOLDOWN
+            )
+    
+    def raise_if_saturated(self, calls: int, items: Optional[int] = None):
+        """
+        Reject a batch straight away if the Groq backlog has no room for it
+        
+        Batches that could never fit, even on an idle server, get a 413 since retrying cannot help;
+        batches that only have to wait for the backlog to clear get a 429.
+        """
+        if max(calls, items or 0) > self.limiter.max_pending:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch too large: at most {self.limiter.max_pending} items per request"
+            )
+        if not self.limiter.can_admit(calls):
+            raise HTTPException(
+                status_code=429,
+                detail="Too many pending requests, please retry shortly",
+                headers={"Retry-After": "1"}
+            )
+    
+    @asynccontextmanager
+    async def _upstream_call(self, **params) -> AsyncIterator[Tuple[Any, TokenReservation]]:
+        """
+        Send a chat completion guarded by the circuit breaker and rate limiter
+        
+        The call slot and token reservation are held until the block exits, so a streamed
+        response keeps its slot while its body is still being read.
+        """
+        if not self.breaker.allow():
+            raise HTTPException(
+                status_code=503,
+                detail="Upstream temporarily unavailable",
+                headers=RETRY_AFTER_COOLDOWN
+            )
+        
+        # Groq counts prompt and completion tokens; assume about four characters per prompt token
+        expected_tokens = params.get("max_tokens", 0) + sum(
+            len(message["content"]) for message in params["messages"]
+        ) // 4
+        
+        try:
+            async with self.limiter.acquire(expected_tokens) as reservation:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(**params),
+                    timeout=GROQ_CALL_TIMEOUT
+                )
+                reservation.accepted = True
+                yield response, reservation
+        except (asyncio.TimeoutError, APITimeoutError) as e:
+            self.breaker.record_failure()
+            logger.error(f"Groq call timed out ({type(e).__name__})")
+            raise HTTPException(
+                status_code=504,
+                detail="Upstream LLM timeout"
+            ) from e
+        except Exception as e:
+            if CircuitBreaker.is_upstream_failure(e):
+                self.breaker.record_failure()
+            else:
+                # Client errors, rate limits and errors in the caller's block say nothing about Groq's
+                # health: they neither close a half-open breaker nor wipe the failure count
+                self.breaker.release_probe()
+            raise
+        except BaseException:
+            # Cancellation says nothing about Groq's health, but must not keep the probe reserved
+            self.breaker.release_probe()
+            raise
+        
+        self.breaker.record_success()
+    
+    async def _complete(self, **params):
+        """Make a chat completion call, settling its token reservation from the reported usage"""
+        async with self._upstream_call(**params) as (response, reservation):
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                reservation.used = usage.total_tokens
+        return response
+    
+    async def _complete_stream(self, usage: Optional[StreamUsage], **params) -> AsyncIterator[str]:
+        """Yield the text deltas of a streamed completion, holding its call slot until the stream is used up or closed"""
+        async with self._upstream_call(**params, stream=True) as (stream, reservation):
+            # Closing the stream releases its HTTP response as soon as iteration stops
+            async with stream:
+                # A trickling stream holds a call slot, so the whole body is bounded, not just each read
+                deadline = time.monotonic() + GROQ_STREAM_TIMEOUT
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=deadline - time.monotonic())
+                    except StopAsyncIteration:
+                        break
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    # Groq attaches usage to the last chunk as the x_groq extension field
+                    x_groq = getattr(chunk, "x_groq", None)
+                    if isinstance(x_groq, dict) and x_groq.get("usage"):
+                        reservation.used = x_groq["usage"].get("total_tokens") or 0
+                        if usage is not None:
+                            usage.tokens_used = reservation.used
+    
+    def _rephrase_cache_key(self, text: str, style: RephraseStyle, **kwargs) -> Optional[str]:
+        """Build the cache key for a rephrase request, or None if it is sampled too randomly to cache"""
+        if kwargs.get('temperature', STYLE_PROMPTS[style].temperature) > CACHE_MAX_TEMPERATURE:
+            return None
+        return ResponseCache.make_key(
+            "rephrase", self.model, text.strip(), style,
+            kwargs.get('temperature'), kwargs.get('max_tokens')
+        )
+    
+    def _content_cache_key(
+        self,
+        prompt: str,
+        content_type: ContentGenerationType,
+        tone: ContentTone,
+        length: ContentLength,
+        context: Optional[str],
+        **kwargs
+    ) -> Optional[str]:
+        """Build the cache key for a content generation request, or None if it is sampled too randomly to cache"""
+        if kwargs.get('temperature', CONTENT_PROMPTS[content_type].temperature) > CACHE_MAX_TEMPERATURE:
+            return None
+        return ResponseCache.make_key(
+            "generate", self.model, prompt.strip(), content_type, tone, length,
+            (context or "").strip(), kwargs.get('temperature'), kwargs.get('max_tokens')
+        )
+    
+    async def _semantic_lookup(self, bucket: Optional[str], text: str) -> Tuple[Optional[Any], Optional[Any]]:
+        """Look for a cached near-duplicate of text, returning (result, embedding)"""
+        if not self.semantic_cache or bucket is None:
+            return None, None
+        
+        try:
+            vector = await self.semantic_cache.embed(text)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {str(e)}")
+            return None, None
+        return self.semantic_cache.get(bucket, vector), vector
+    
+    @staticmethod
+    def _cache_hit(result: Union[RephraseResult, ContentResult]) -> Union[RephraseResult, ContentResult]:
+        """Report a cached result as served instantly without using any tokens"""
+        return msgspec.structs.replace(result, processing_time=0.0, tokens_used=0, cached=True)
+    
+    @staticmethod
+    def _messages(system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+        """Build the system and user message pair sent with every completion"""
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    @staticmethod
+    def _strip_wrapping_quotes(text: str) -> str:
+        """Remove quotes if they wrap the entire text"""
+        if len(text) >= 2 and text[0] == text[-1] and text[0] in ('"', "'"):
+            return text[1:-1]
+        return text
+    
+    def _rephrase_params(self, text: str, style: RephraseStyle, **kwargs) -> Dict:
+        """Build the chat completion parameters for a rephrase request"""
+        # Get style configuration
+        style_config = STYLE_PROMPTS[style]
+        
+        # Prepare messages
+        messages = self._messages(style_config.system_prompt, style_config.render_user(text=text))
+        
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": kwargs.get('temperature', style_config.temperature),
+            "max_tokens": kwargs.get('max_tokens', 1000),
+            "top_p": 1
+        }
+    
+    def _content_params(
+        self,
+        prompt: str,
+        content_type: ContentGenerationType,
+        tone: ContentTone,
+        length: ContentLength,
+        context: Optional[str],
+        **kwargs
+    ) -> Dict:
+        """Build the chat completion parameters for a content generation request"""
+        spec = PROMPT_CACHE[(content_type, tone, length)]
+        
+        # Fill in the request-specific parts of the user message
+        user_message = spec.render_user(
+            prompt=prompt,
+            context=context or "No additional context provided"
+        )
+        
+        # Prepare messages
+        messages = self._messages(spec.system_prompt, user_message)
+        
+        # Explicit max tokens are still held to the hard limit
+        max_tokens = min(kwargs['max_tokens'], CONTENT_MAX_TOKENS) if 'max_tokens' in kwargs else spec.max_tokens
+        
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": kwargs.get('temperature', spec.temperature),
+            "max_tokens": max_tokens,
+            "top_p": 1
+        }
     
     async def rephrase_text(
         self, 
         text: str, 
         style: RephraseStyle = RephraseStyle.FORMAL,
         **kwargs
-    ) -> Dict:
+    ) -> RephraseResult:
         """
         Rephrase text using Groq AI
         
@@ -321,7 +1219,7 @@ class GroqAIService:
             **kwargs: Additional parameters
             
         Returns:
-            Dictionary containing rephrased text and metadata
+            RephraseResult containing rephrased text and metadata
         """
         if not self.client:
             raise HTTPException(
@@ -329,45 +1227,67 @@ class GroqAIService:
                 detail="Groq client not initialized. Check API key."
             )
         
+        # Serve repeated requests from the cache
+        cache_key = self._rephrase_cache_key(text, style, **kwargs)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return self._cache_hit(cached)
+        
+        # Then near-duplicates of earlier texts with the same settings
+        semantic_bucket = ResponseCache.make_key(
+            "rephrase", self.model, style, kwargs.get('temperature'), kwargs.get('max_tokens')
+        ) if cache_key else None
+        similar, embedding = await self._semantic_lookup(semantic_bucket, text)
+        if similar is not None:
+            return self._cache_hit(similar)
+        
+        start_time = time.perf_counter()
+        
+        # Texts that differ from confirmed ones only in their numbers reuse the output template
+        template_key = None
+        if self.template_cache and cache_key:
+            skeleton, numbers = TemplateCache.fingerprint(text)
+            if numbers:
+                template_key = ResponseCache.make_key(
+                    "rephrase-template", self.model, skeleton, style,
+                    kwargs.get('temperature'), kwargs.get('max_tokens')
+                )
+                templated = self.template_cache.lookup(template_key, numbers)
+                if templated is not None:
+                    return self._cache_hit(RephraseResult(
+                        rephrased_text=templated,
+                        processing_time=0.0,
+                        model_used=self.model
+                    ))
+        
         try:
-            start_time = datetime.now()
-            
-            # Get style configuration
-            style_config = STYLE_PROMPTS[style]
-            
-            # Prepare messages
-            messages = [
-                {"role": "system", "content": style_config.system_prompt},
-                {"role": "user", "content": style_config.user_template.format(text=text)}
-            ]
             
             # Make API call
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=kwargs.get('temperature', style_config.temperature),
-                max_tokens=kwargs.get('max_tokens', 1000),
-                top_p=1,
+            response = await self._complete(
+                **self._rephrase_params(text, style, **kwargs),
                 stream=False
             )
             
             # Extract rephrased text
-            rephrased_text = response.choices[0].message.content.strip()
-            
-            # Remove quotes if they wrap the entire response
-            if (rephrased_text.startswith('"') and rephrased_text.endswith('"')) or \
-               (rephrased_text.startswith("'") and rephrased_text.endswith("'")):
-                rephrased_text = rephrased_text[1:-1]
+            rephrased_text = self._strip_wrapping_quotes(response.choices[0].message.content.strip())
             
-            processing_time = (datetime.now() - start_time).total_seconds()
+            processing_time = time.perf_counter() - start_time
             
-            return {
-                "rephrased_text": rephrased_text,
-                "processing_time": processing_time,
-                "tokens_used": response.usage.total_tokens if hasattr(response, 'usage') else None,
-                "model_used": self.model
-            }
+            result = RephraseResult(
+                rephrased_text=rephrased_text,
+                processing_time=processing_time,
+                tokens_used=response.usage.total_tokens if hasattr(response, 'usage') else None,
+                model_used=self.model
+            )
+            self.cache.set(cache_key, result)
+            if embedding is not None:
+                self.semantic_cache.set(semantic_bucket, embedding, result)
+            if template_key:
+                self.template_cache.record(template_key, numbers, rephrased_text)
+            return result
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error rephrasing text: {str(e)}")
             raise HTTPException(
@@ -375,6 +1295,139 @@ class GroqAIService:
                 detail=f"Failed to rephrase text: {str(e)}"
             )
 
+    async def rephrase_texts(
+        self,
+        texts: List[str],
+        style: RephraseStyle = RephraseStyle.FORMAL,
+        **kwargs
+    ) -> List[Union[RephraseResult, Exception]]:
+        """
+        Rephrase several texts with the same settings in as few Groq AI calls as possible
+        
+        Texts are split into chunks small enough for one call to answer in full, and the chunks
+        run concurrently. A chunk falls back to per-text calls only if its reply is unusable;
+        timeouts and upstream failures are returned for every text of the chunk instead.
+        
+        Args:
+            texts: Texts to rephrase
+            style: Rephrasing style
+            **kwargs: Additional parameters, applied to every text
+            
+        Returns:
+            One RephraseResult per text in input order; failed texts are returned as exceptions
+        """
+        if not self.client:
+            raise HTTPException(
+                status_code=500, 
+                detail="Groq client not initialized. Check API key."
+            )
+        
+        # Serve repeated texts from the cache
+        cache_keys = [self._rephrase_cache_key(text, style, **kwargs) for text in texts]
+        cached = [self.cache.get(key) for key in cache_keys]
+        results: List[Any] = [self._cache_hit(result) if result is not None else None for result in cached]
+        pending = [i for i, result in enumerate(results) if result is None]
+        
+        chunks = [[pending[j] for j in chunk] for chunk in self.batch_chunks([texts[i] for i in pending])]
+        chunk_results = await asyncio.gather(
+            *[
+                self._rephrase_chunk([texts[i] for i in chunk], [cache_keys[i] for i in chunk], style, **kwargs)
+                for chunk in chunks
+            ]
+        )
+        for chunk, outcomes in zip(chunks, chunk_results):
+            for i, result in zip(chunk, outcomes):
+                results[i] = result
+        
+        return results
+    
+    @staticmethod
+    def batch_chunks(texts: List[str]) -> List[List[int]]:
+        """Split texts into chunks of indices, each small enough for one batched call to answer in full"""
+        chunks: List[List[int]] = []
+        chunk_tokens = 0
+        for i, text in enumerate(texts):
+            # About four characters per token, as in _complete
+            tokens = len(text) // 4 + 1
+            if not chunks or len(chunks[-1]) >= BATCH_MAX_TEXTS or chunk_tokens + tokens > BATCH_MAX_INPUT_TOKENS:
+                chunks.append([])
+                chunk_tokens = 0
+            chunks[-1].append(i)
+            chunk_tokens += tokens
+        return chunks
+    
+    async def _rephrase_chunk(
+        self,
+        texts: List[str],
+        cache_keys: List[Optional[str]],
+        style: RephraseStyle,
+        **kwargs
+    ) -> List[Union[RephraseResult, Exception]]:
+        """Rephrase one chunk in a single call, falling back to per-text calls if the reply is unusable"""
+        if len(texts) > 1:
+            try:
+                batched = await self._rephrase_batched(texts, style, **kwargs)
+            except Exception as e:
+                # A timeout, open breaker or failing upstream would only repeat for every text
+                if isinstance(e, HTTPException) or CircuitBreaker.is_upstream_failure(e):
+                    return [e] * len(texts)
+                logger.warning(f"Batched rephrase failed, falling back to individual calls: {str(e)}")
+            else:
+                for key, result in zip(cache_keys, batched):
+                    self.cache.set(key, result)
+                return batched
+            
+            # The batch was admitted as one call; its per-text fallback has to fit the backlog too
+            try:
+                self.raise_if_saturated(len(texts))
+            except HTTPException as e:
+                return [e] * len(texts)
+        
+        return await asyncio.gather(
+            *[self.rephrase_text(text, style, **kwargs) for text in texts],
+            return_exceptions=True
+        )
+    
+    async def _rephrase_batched(self, texts: List[str], style: RephraseStyle, **kwargs) -> List[RephraseResult]:
+        """Rephrase texts in one JSON-mode completion, raising if the reply does not match"""
+        start_time = time.perf_counter()
+        style_config = STYLE_PROMPTS[style]
+        
+        numbered_texts = "\n".join(f"<<<{i}>>>\n{text}" for i, text in enumerate(texts, 1))
+        messages = self._messages(
+            style_config.system_prompt,
+            BATCH_TEMPLATE_CACHE[style](count=str(len(texts)), texts=numbered_texts)
+        )
+        
+        response = await self._complete(
+            model=self.model,
+            messages=messages,
+            temperature=kwargs.get('temperature', style_config.temperature),
+            max_tokens=min(kwargs.get('max_tokens', 1000) * len(texts), BATCH_MAX_TOKENS),
+            top_p=1,
+            response_format={"type": "json_object"},
+            stream=False
+        )
+        
+        rephrased = orjson.loads(response.choices[0].message.content)["results"]
+        if len(rephrased) != len(texts) or not all(isinstance(item, str) for item in rephrased):
+            raise ValueError(f"expected {len(texts)} rephrased strings, got {len(rephrased)}")
+        
+        processing_time = time.perf_counter() - start_time
+        # Token usage is reported per call, so attribute an even share to each text
+        total_tokens = response.usage.total_tokens if getattr(response, 'usage', None) else None
+        tokens_used = total_tokens // len(texts) if total_tokens is not None else None
+        
+        return [
+            RephraseResult(
+                rephrased_text=self._strip_wrapping_quotes(item.strip()),
+                processing_time=processing_time,
+                tokens_used=tokens_used,
+                model_used=self.model
+            )
+            for item in rephrased
+        ]
+    
     async def generate_content(
         self,
         prompt: str,
@@ -383,7 +1436,7 @@ class GroqAIService:
         length: ContentLength = ContentLength.MEDIUM,
         context: Optional[str] = None,
         **kwargs
-    ) -> Dict:
+    ) -> ContentResult:
         """
         Generate content using Groq AI
         
@@ -396,7 +1449,7 @@ class GroqAIService:
             **kwargs: Additional parameters
             
         Returns:
-            Dictionary containing generated content and metadata
+            ContentResult containing generated content and metadata
         """
         if not self.client:
             raise HTTPException(
@@ -404,83 +1457,132 @@ class GroqAIService:
                 detail="Groq client not initialized. Check API key."
             )
         
+        # Serve repeated requests from the cache
+        cache_key = self._content_cache_key(prompt, content_type, tone, length, context, **kwargs)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return self._cache_hit(cached)
+        
+        # Then near-duplicates of earlier prompts with the same settings
+        semantic_bucket = ResponseCache.make_key(
+            "generate", self.model, content_type, tone, length,
+            kwargs.get('temperature'), kwargs.get('max_tokens')
+        ) if cache_key else None
+        similar, embedding = await self._semantic_lookup(
+            semantic_bucket, f"{prompt.strip()}\n\n{(context or '').strip()}"
+        )
+        if similar is not None:
+            return self._cache_hit(similar)
+        
         try:
-            start_time = datetime.now()
-            
-            # Get content generation configuration
-            content_config = CONTENT_PROMPTS[content_type]
-            tone_modifier = TONE_MODIFIERS[tone]
-            length_info = LENGTH_GUIDELINES[length]
-            
-            # Build system prompt
-            system_prompt = f"{content_config.system_prompt}\n\n{tone_modifier}\n\nTarget length: {length_info['description']}"
-            
-            # Format user message based on content type
-            if content_type == ContentGenerationType.BRAINSTORM:
-                user_message = content_config.user_template.format(
-                    prompt=prompt,
-                    context=context or "No additional context provided",
-                    tone=tone.value,
-                    length=length_info['brainstorm_items']
-                )
-            else:
-                user_message = content_config.user_template.format(
-                    prompt=prompt,
-                    context=context or "No additional context provided",
-                    tone=tone.value,
-                    length=length.value
-                )
-            
-            # Prepare messages
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ]
-            
-            # Calculate max tokens based on length
-            max_tokens = min(
-                kwargs.get('max_tokens', length_info['tokens']),
-                2000  # Hard limit
-            )
+            start_time = time.perf_counter()
             
             # Make API call
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=kwargs.get('temperature', content_config.temperature),
-                max_tokens=max_tokens,
-                top_p=1,
+            response = await self._complete(
+                **self._content_params(prompt, content_type, tone, length, context, **kwargs),
                 stream=False
             )
             
             # Extract generated content
             generated_content = response.choices[0].message.content.strip()
             
-            processing_time = (datetime.now() - start_time).total_seconds()
+            processing_time = time.perf_counter() - start_time
             
-            return {
-                "generated_content": generated_content,
-                "processing_time": processing_time,
-                "tokens_used": response.usage.total_tokens if hasattr(response, 'usage') else None,
-                "model_used": self.model,
-                "content_type": content_type,
-                "tone": tone,
-                "length": length
-            }
+            result = ContentResult(
+                generated_content=generated_content,
+                processing_time=processing_time,
+                tokens_used=response.usage.total_tokens if hasattr(response, 'usage') else None,
+                model_used=self.model,
+                content_type=content_type,
+                tone=tone,
+                length=length
+            )
+            self.cache.set(cache_key, result)
+            if embedding is not None:
+                self.semantic_cache.set(semantic_bucket, embedding, result)
+            return result
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error generating content: {str(e)}")
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to generate content: {str(e)}"
             )
-
-# Initialize service
-ai_service = GroqAIService(groq_client) if groq_client else None
+    
+    def rephrase_text_stream(
+        self,
+        text: str,
+        style: RephraseStyle = RephraseStyle.FORMAL,
+        usage: Optional[StreamUsage] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Stream rephrased text from Groq AI as it is generated
+        
+        Args:
+            text: Text to rephrase
+            style: Rephrasing style
+            usage: Filled in with the tokens used once the stream finishes
+            **kwargs: Additional parameters
+            
+        Returns:
+            Async iterator of rephrased text fragments in generation order
+        """
+        if not self.client:
+            raise HTTPException(
+                status_code=500, 
+                detail="Groq client not initialized. Check API key."
+            )
+        
+        return self._complete_stream(usage, **self._rephrase_params(text, style, **kwargs))
+    
+    def generate_content_stream(
+        self,
+        prompt: str,
+        content_type: ContentGenerationType = ContentGenerationType.NEW,
+        tone: ContentTone = ContentTone.PROFESSIONAL,
+        length: ContentLength = ContentLength.MEDIUM,
+        context: Optional[str] = None,
+        usage: Optional[StreamUsage] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated content from Groq AI as it is generated
+        
+        Args:
+            prompt: Content generation prompt
+            content_type: Type of content generation
+            tone: Tone of the content
+            length: Desired length
+            context: Optional context text
+            usage: Filled in with the tokens used once the stream finishes
+            **kwargs: Additional parameters
+            
+        Returns:
+            Async iterator of generated content fragments in generation order
+        """
+        if not self.client:
+            raise HTTPException(
+                status_code=500, 
+                detail="Groq client not initialized. Check API key."
+            )
+        
+        return self._complete_stream(
+            usage,
+            **self._content_params(prompt, content_type, tone, length, context, **kwargs)
+        )
 
 # Dependency functions
-async def get_ai_service() -> GroqAIService:
-    """Get the AI service instance"""
+def ai_service_from(request: Request) -> GroqAIService:
+    """
+    Get the AI service instance created at startup straight from app.state
+    
+    Endpoints call this directly rather than through Depends, so tests swap the service by
+    setting `app.state.ai_service`, not through `app.dependency_overrides`.
+    """
+    ai_service = getattr(request.app.state, "ai_service", None)
     if not ai_service:
         raise HTTPException(
             status_code=503,
@@ -494,21 +1596,68 @@ async def verify_api_key(credentials: HTTPAuthorizationCredentials = Depends(sec
     # For now, we'll just pass through
     return credentials
 
+# Timestamp helpers
+_timestamp_cache = {"second": 0, "iso": ""}
+
+def iso_now_cached() -> str:
+    """Current UTC time as an ISO string, reformatted at most once per second"""
+    now = int(time.time())
+    if now != _timestamp_cache["second"]:
+        _timestamp_cache["second"] = now
+        _timestamp_cache["iso"] = datetime.fromtimestamp(now, tz=timezone.utc).isoformat()
+    return _timestamp_cache["iso"]
+
+# Streaming helpers
+async def sse_event_stream(
+    fragments: AsyncIterator[str],
+    operation: str,
+    usage: Optional[StreamUsage] = None
+) -> AsyncIterator[bytes]:
+    """Format streamed text fragments as Server-Sent Events, ending with a `done` summary event"""
+    start_time = time.perf_counter()
+    encode = STREAM_ENCODER.encode
+    try:
+        async for fragment in fragments:
+            yield b"data: " + encode(StreamDelta(fragment)) + b"\n\n"
+    except Exception as e:
+        # The response has already started, so report the failure in-band
+        logger.error(f"Error streaming {operation}: {str(e)}")
+        yield b"event: error\ndata: " + encode(StreamError(f"Failed to stream {operation}")) + b"\n\n"
+        return
+    finally:
+        # Close the upstream stream right away, so a disconnect frees its call slot
+        await fragments.aclose()
+    
+    summary = StreamDone(
+        tokens_used=usage.tokens_used if usage else 0,
+        processing_time=time.perf_counter() - start_time
+    )
+    yield b"event: done\ndata: " + encode(summary) + b"\n\n"
+    yield b"data: [DONE]\n\n"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
 # API Endpoints
 @app.get("/health", response_model=HealthResponse)
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint"""
-    return HealthResponse(
-        status="healthy",
-        timestamp=datetime.now(),
-        groq_available=groq_client is not None
-    )
+    ai_service = getattr(request.app.state, "ai_service", None)
+    # Plain dicts are validated once, by the response model
+    return {
+        "status": "healthy",
+        "timestamp": iso_now_cached(),
+        "groq_available": ai_service is not None,
+        "circuit_state": ai_service.breaker.state if ai_service else None
+    }
 
 @app.post("/rephrase", response_model=RephraseResponse)
 async def rephrase_text(
     request: RephraseRequest,
-    background_tasks: BackgroundTasks,
-    service: GroqAIService = Depends(get_ai_service)
+    response: Response,
+    http_request: Request
 ):
     """
     Rephrase text using AI
@@ -519,13 +1668,10 @@ async def rephrase_text(
     - **max_tokens**: Maximum tokens for response
     - **temperature**: Temperature for AI generation
     """
+    service = ai_service_from(http_request)
     try:
         logger.info(f"Rephrasing request: style={request.style}, length={len(request.text)}")
         
-        # Validate text length
-        if len(request.text.strip()) == 0:
-            raise HTTPException(status_code=400, detail="Text cannot be empty")
-        
         # Call rephrase service
         result = await service.rephrase_text(
             text=request.text,
@@ -533,26 +1679,26 @@ async def rephrase_text(
             temperature=request.temperature,
             max_tokens=request.max_tokens
         )
+        response.headers["X-Cache"] = "HIT" if result.cached else "MISS"
         
         # Log successful rephrase (in background)
-        background_tasks.add_task(
-            log_operation_success,
+        log_operation_success(
             operation="rephrase",
             details={
                 "original_length": len(request.text),
-                "rephrased_length": len(result["rephrased_text"]),
+                "rephrased_length": len(result.rephrased_text),
                 "style": request.style,
-                "processing_time": result["processing_time"]
+                "processing_time": result.processing_time
             }
         )
         
-        return RephraseResponse(
-            original_text=request.text,
-            rephrased_text=result["rephrased_text"],
-            style=request.style,
-            processing_time=result["processing_time"],
-            tokens_used=result.get("tokens_used")
-        )
+        return {
+            "original_text": request.text,
+            "rephrased_text": result.rephrased_text,
+            "style": request.style,
+            "processing_time": result.processing_time,
+            "tokens_used": result.tokens_used
+        }
         
     except HTTPException:
         raise
@@ -566,8 +1712,8 @@ async def rephrase_text(
 @app.post("/generate-content", response_model=ContentGenerationResponse)
 async def generate_content(
     request: ContentGenerationRequest,
-    background_tasks: BackgroundTasks,
-    service: GroqAIService = Depends(get_ai_service)
+    response: Response,
+    http_request: Request
 ):
     """
     Generate content using AI
@@ -579,22 +1725,15 @@ async def generate_content(
     - **length**: Desired length (short, medium, long)
     - **max_tokens**: Maximum tokens for response
     - **temperature**: Temperature for AI generation
+    - **stream**: Stream the content as Server-Sent Events, as `/generate-content/stream` does
     """
+    service = ai_service_from(http_request)
+    if request.stream:
+        return await generate_content_stream(request, http_request)
+    
     try:
         logger.info(f"Content generation request: type={request.type}, tone={request.tone}, length={request.length}")
         
-        # Validate prompt
-        if len(request.prompt.strip()) == 0:
-            raise HTTPException(status_code=400, detail="Prompt cannot be empty")
-        
-        # Validate context for content types that require it
-        if request.type in [ContentGenerationType.CONTINUE, ContentGenerationType.EXPAND, ContentGenerationType.SUMMARIZE]:
-            if not request.context or len(request.context.strip()) == 0:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Context is required for {request.type} content generation"
-                )
-        
         # Call content generation service
         result = await service.generate_content(
             prompt=request.prompt,
@@ -605,31 +1744,31 @@ async def generate_content(
             temperature=request.temperature,
             max_tokens=request.max_tokens
         )
+        response.headers["X-Cache"] = "HIT" if result.cached else "MISS"
         
         # Log successful generation (in background)
-        background_tasks.add_task(
-            log_operation_success,
+        log_operation_success(
             operation="content_generation",
             details={
                 "prompt_length": len(request.prompt),
                 "context_length": len(request.context or ""),
-                "generated_length": len(result["generated_content"]),
+                "generated_length": len(result.generated_content),
                 "type": request.type,
                 "tone": request.tone,
                 "length": request.length,
-                "processing_time": result["processing_time"]
+                "processing_time": result.processing_time
             }
         )
         
-        return ContentGenerationResponse(
-            generated_content=result["generated_content"],
-            prompt=request.prompt,
-            type=request.type,
-            tone=request.tone,
-            length=request.length,
-            processing_time=result["processing_time"],
-            tokens_used=result.get("tokens_used")
-        )
+        return {
+            "generated_content": result.generated_content,
+            "prompt": request.prompt,
+            "type": request.type,
+            "tone": request.tone,
+            "length": request.length,
+            "processing_time": result.processing_time,
+            "tokens_used": result.tokens_used
+        }
         
     except HTTPException:
         raise
@@ -640,67 +1779,216 @@ async def generate_content(
             detail="An unexpected error occurred"
         )
 
+@app.post("/rephrase/stream")
+async def rephrase_text_stream(
+    request: RephraseRequest,
+    http_request: Request
+):
+    """
+    Rephrase text using AI, streaming the result as Server-Sent Events
+    
+    Each event carries a `delta` text fragment. A final `done` event reports
+    `tokens_used` and `processing_time`, then the stream ends with `[DONE]`.
+    """
+    service = ai_service_from(http_request)
+    logger.info(f"Streaming rephrase request: style={request.style}, length={len(request.text)}")
+    service.raise_if_unavailable()
+    
+    usage = StreamUsage()
+    fragments = service.rephrase_text_stream(
+        text=request.text,
+        style=request.style,
+        usage=usage,
+        temperature=request.temperature,
+        max_tokens=request.max_tokens
+    )
+    return StreamingResponse(
+        sse_event_stream(fragments, "rephrase", usage),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@app.post("/generate-content/stream")
+async def generate_content_stream(
+    request: ContentGenerationRequest,
+    http_request: Request
+):
+    """
+    Generate content using AI, streaming the result as Server-Sent Events
+    
+    Each event carries a `delta` text fragment. A final `done` event reports
+    `tokens_used` and `processing_time`, then the stream ends with `[DONE]`.
+    """
+    service = ai_service_from(http_request)
+    logger.info(f"Streaming content generation request: type={request.type}, tone={request.tone}, length={request.length}")
+    service.raise_if_unavailable()
+    
+    usage = StreamUsage()
+    fragments = service.generate_content_stream(
+        prompt=request.prompt,
+        content_type=request.type,
+        tone=request.tone,
+        length=request.length,
+        context=request.context,
+        usage=usage,
+        temperature=request.temperature,
+        max_tokens=request.max_tokens
+    )
+    return StreamingResponse(
+        sse_event_stream(fragments, "content generation", usage),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+# Batch result shaping, shared by the batch endpoints
+def _error_text(exc: Exception) -> str:
+    """Client-facing message for a failed batch item"""
+    return exc.detail if isinstance(exc, HTTPException) else str(exc)
+
+def _rephrase_ok(req: RephraseRequest, result: RephraseResult) -> Dict[str, Any]:
+    return RephraseResponse(
+        original_text=req.text,
+        rephrased_text=result.rephrased_text,
+        style=req.style,
+        processing_time=result.processing_time,
+        tokens_used=result.tokens_used
+    ).model_dump()
+
+def _rephrase_error(req: RephraseRequest, exc: Exception) -> Dict[str, Any]:
+    return {
+        "error": _error_text(exc),
+        "original_text": req.text,
+        "style": req.style
+    }
+
+def _content_ok(req: ContentGenerationRequest, result: ContentResult) -> Dict[str, Any]:
+    return ContentGenerationResponse(
+        generated_content=result.generated_content,
+        prompt=req.prompt,
+        type=req.type,
+        tone=req.tone,
+        length=req.length,
+        processing_time=result.processing_time,
+        tokens_used=result.tokens_used
+    ).model_dump()
+
+def _content_error(req: ContentGenerationRequest, exc: Exception) -> Dict[str, Any]:
+    return {
+        "error": _error_text(exc),
+        "prompt": req.prompt,
+        "type": req.type
+    }
+
 @app.post("/rephrase/batch")
 async def rephrase_batch(
     requests: List[RephraseRequest],
-    service: GroqAIService = Depends(get_ai_service)
+    http_request: Request
 ):
     """
     Rephrase multiple texts in batch
-    Limited to 10 requests per batch
+    Items sharing style, temperature and max_tokens are rephrased together, in as few Groq
+    calls as their length allows; batches larger than the Groq backlog are refused with 413, and batches are
+    refused with 429 while the backlog is full
     """
-    if len(requests) > 10:
-        raise HTTPException(
-            status_code=400,
-            detail="Batch size limited to 10 requests"
-        )
+    service = ai_service_from(http_request)
+    
+    # Items with identical settings share one Groq call; groups run concurrently
+    groups: Dict[Tuple[RephraseStyle, float, int], List[int]] = {}
+    for index, req in enumerate(requests):
+        groups.setdefault((req.style, req.temperature, req.max_tokens), []).append(index)
+    # Admission is charged per Groq call, not per item
+    calls = sum(
+        len(GroqAIService.batch_chunks([requests[i].text for i in indices]))
+        for indices in groups.values()
+    )
+    service.raise_if_saturated(calls, items=len(requests))
+    
+    group_results = await asyncio.gather(
+        *[
+            service.rephrase_texts(
+                [requests[i].text for i in indices],
+                style=style,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            for (style, temperature, max_tokens), indices in groups.items()
+        ],
+        return_exceptions=True
+    )
+    
+    raw_results: List[Any] = [None] * len(requests)
+    for indices, outcome in zip(groups.values(), group_results):
+        for position, i in enumerate(indices):
+            raw_results[i] = outcome if isinstance(outcome, Exception) else outcome[position]
+    
+    results = [
+        _rephrase_error(req, result) if isinstance(result, Exception) else _rephrase_ok(req, result)
+        for req, result in zip(requests, raw_results)
+    ]
+    
+    return ORJSONResponse({"results": results})
+
+@app.post("/rephrase/batch/stream")
+async def rephrase_batch_stream(
+    requests: List[RephraseRequest],
+    http_request: Request
+):
+    """
+    Rephrase multiple texts, streaming each result as newline-delimited JSON when it completes
+    Lines arrive in completion order and carry the `index` of their request; batches larger
+    than the Groq backlog are refused with 413, and batches are refused with 429 while it is full
+    """
+    service = ai_service_from(http_request)
+    service.raise_if_unavailable()
+    service.raise_if_saturated(len(requests))
     
-    results = []
-    for req in requests:
+    async def rephrase_indexed(index: int, req: RephraseRequest) -> Tuple[int, Union[RephraseResult, Exception]]:
         try:
-            result = await service.rephrase_text(
+            return index, await service.rephrase_text(
                 text=req.text,
                 style=req.style,
                 temperature=req.temperature,
                 max_tokens=req.max_tokens
             )
-            
-            results.append(RephraseResponse(
-                original_text=req.text,
-                rephrased_text=result["rephrased_text"],
-                style=req.style,
-                processing_time=result["processing_time"],
-                tokens_used=result.get("tokens_used")
-            ))
-            
         except Exception as e:
-            results.append({
-                "error": str(e),
-                "original_text": req.text,
-                "style": req.style
-            })
+            return index, e
+    
+    async def ndjson_lines() -> AsyncIterator[bytes]:
+        tasks = [asyncio.create_task(rephrase_indexed(i, req)) for i, req in enumerate(requests)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                index, result = await next_result
+                req = requests[index]
+                if isinstance(result, Exception):
+                    item = {"index": index, **_rephrase_error(req, result)}
+                else:
+                    item = {"index": index, **_rephrase_ok(req, result)}
+                yield orjson.dumps(item) + b"\n"
+        finally:
+            # A client that disconnects early must not keep its remaining Groq calls running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
     
-    return {"results": results}
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
 
 @app.post("/generate-content/batch")
 async def generate_content_batch(
     requests: List[ContentGenerationRequest],
-    service: GroqAIService = Depends(get_ai_service)
+    http_request: Request
 ):
     """
     Generate content for multiple prompts in batch
-    Limited to 5 requests per batch due to higher token usage
+    Batches larger than the Groq backlog are refused with 413, and batches are refused with
+    429 while the backlog is full
     """
-    if len(requests) > 5:
-        raise HTTPException(
-            status_code=400,
-            detail="Batch size limited to 5 requests for content generation"
-        )
+    service = ai_service_from(http_request)
+    service.raise_if_saturated(len(requests))
     
-    results = []
-    for req in requests:
-        try:
-            result = await service.generate_content(
+    # Items are independent, so generate them concurrently
+    raw_results = await asyncio.gather(
+        *[
+            service.generate_content(
                 prompt=req.prompt,
                 content_type=req.type,
                 tone=req.tone,
@@ -709,184 +1997,235 @@ async def generate_content_batch(
                 temperature=req.temperature,
                 max_tokens=req.max_tokens
             )
-            
-            results.append(ContentGenerationResponse(
-                generated_content=result["generated_content"],
-                prompt=req.prompt,
-                type=req.type,
-                tone=req.tone,
-                length=req.length,
-                processing_time=result["processing_time"],
-                tokens_used=result.get("tokens_used")
-            ))
-            
-        except Exception as e:
-            results.append({
-                "error": str(e),
-                "prompt": req.prompt,
-                "type": req.type
-            })
+            for req in requests
+        ],
+        return_exceptions=True
+    )
+    
+    results = [
+        _content_error(req, result) if isinstance(result, Exception) else _content_ok(req, result)
+        for req, result in zip(requests, raw_results)
+    ]
     
-    return {"results": results}
+    return ORJSONResponse({"results": results})
+
+# Static option listings, serialized once at import time and cacheable by clients
+STATIC_HEADERS = {"Cache-Control": "public, max-age=86400"}
+
+STYLES_PAYLOAD = orjson.dumps({
+    "styles": [
+        {
+            "key": RephraseStyle.FORMAL,
+            "name": "Formal",
+            "description": "Professional and business-appropriate tone"
+        },
+        {
+            "key": RephraseStyle.CASUAL,
+            "name": "Casual",
+            "description": "Conversational and friendly tone"
+        },
+        {
+            "key": RephraseStyle.CREATIVE,
+            "name": "Creative",
+            "description": "Engaging and expressive style"
+        },
+        {
+            "key": RephraseStyle.CONCISE,
+            "name": "Concise",
+            "description": "Brief and to-the-point"
+        }
+    ]
+})
 
 @app.get("/styles")
 async def get_available_styles():
     """Get available rephrasing styles and their descriptions"""
-    return {
-        "styles": [
-            {
-                "key": RephraseStyle.FORMAL,
-                "name": "Formal",
-                "description": "Professional and business-appropriate tone"
-            },
-            {
-                "key": RephraseStyle.CASUAL,
-                "name": "Casual",
-                "description": "Conversational and friendly tone"
-            },
-            {
-                "key": RephraseStyle.CREATIVE,
-                "name": "Creative",
-                "description": "Engaging and expressive style"
-            },
-            {
-                "key": RephraseStyle.CONCISE,
-                "name": "Concise",
-                "description": "Brief and to-the-point"
-            }
-        ]
-    }
+    return Response(STYLES_PAYLOAD, media_type="application/json", headers=STATIC_HEADERS)
+
+CONTENT_TYPES_PAYLOAD = orjson.dumps({
+    "types": [
+        {
+            "key": ContentGenerationType.NEW,
+            "name": "New Content",
+            "description": "Create completely new content from scratch",
+            "requires_context": False
+        },
+        {
+            "key": ContentGenerationType.CONTINUE,
+            "name": "Continue Writing",
+            "description": "Continue from where the provided text left off",
+            "requires_context": True
+        },
+        {
+            "key": ContentGenerationType.EXPAND,
+            "name": "Expand Ideas",
+            "description": "Elaborate and expand on existing content",
+            "requires_context": True
+        },
+        {
+            "key": ContentGenerationType.BRAINSTORM,
+            "name": "Brainstorm",
+            "description": "Generate creative ideas and bullet points",
+            "requires_context": False
+        },
+        {
+            "key": ContentGenerationType.OUTLINE,
+            "name": "Create Outline",
+            "description": "Generate a structured outline for the topic",
+            "requires_context": False
+        },
+        {
+            "key": ContentGenerationType.SUMMARIZE,
+            "name": "Summarize",
+            "description": "Create a concise summary of provided content",
+            "requires_context": True
+        }
+    ]
+})
 
 @app.get("/content-types")
 async def get_content_types():
     """Get available content generation types and their descriptions"""
-    return {
-        "types": [
-            {
-                "key": ContentGenerationType.NEW,
-                "name": "New Content",
-                "description": "Create completely new content from scratch",
-                "requires_context": False
-            },
-            {
-                "key": ContentGenerationType.CONTINUE,
-                "name": "Continue Writing",
-                "description": "Continue from where the provided text left off",
-                "requires_context": True
-            },
-            {
-                "key": ContentGenerationType.EXPAND,
-                "name": "Expand Ideas",
-                "description": "Elaborate and expand on existing content",
-                "requires_context": True
-            },
-            {
-                "key": ContentGenerationType.BRAINSTORM,
-                "name": "Brainstorm",
-                "description": "Generate creative ideas and bullet points",
-                "requires_context": False
-            },
-            {
-                "key": ContentGenerationType.OUTLINE,
-                "name": "Create Outline",
-                "description": "Generate a structured outline for the topic",
-                "requires_context": False
-            },
-            {
-                "key": ContentGenerationType.SUMMARIZE,
-                "name": "Summarize",
-                "description": "Create a concise summary of provided content",
-                "requires_context": True
-            }
-        ]
-    }
+    return Response(CONTENT_TYPES_PAYLOAD, media_type="application/json", headers=STATIC_HEADERS)
+
+TONES_PAYLOAD = orjson.dumps({
+    "tones": [
+        {
+            "key": ContentTone.PROFESSIONAL,
+            "name": "Professional",
+            "description": "Business-appropriate, formal tone"
+        },
+        {
+            "key": ContentTone.CASUAL,
+            "name": "Casual",
+            "description": "Friendly, conversational tone"
+        },
+        {
+            "key": ContentTone.CREATIVE,
+            "name": "Creative",
+            "description": "Imaginative and engaging style"
+        },
+        {
+            "key": ContentTone.ACADEMIC,
+            "name": "Academic",
+            "description": "Scholarly, research-oriented tone"
+        },
+        {
+            "key": ContentTone.PERSUASIVE,
+            "name": "Persuasive",
+            "description": "Convincing and compelling tone"
+        }
+    ]
+})
 
 @app.get("/tones")
 async def get_content_tones():
     """Get available content tones and their descriptions"""
-    return {
-        "tones": [
-            {
-                "key": ContentTone.PROFESSIONAL,
-                "name": "Professional",
-                "description": "Business-appropriate, formal tone"
-            },
-            {
-                "key": ContentTone.CASUAL,
-                "name": "Casual",
-                "description": "Friendly, conversational tone"
-            },
-            {
-                "key": ContentTone.CREATIVE,
-                "name": "Creative",
-                "description": "Imaginative and engaging style"
-            },
-            {
-                "key": ContentTone.ACADEMIC,
-                "name": "Academic",
-                "description": "Scholarly, research-oriented tone"
-            },
-            {
-                "key": ContentTone.PERSUASIVE,
-                "name": "Persuasive",
-                "description": "Convincing and compelling tone"
-            }
-        ]
-    }
+    return Response(TONES_PAYLOAD, media_type="application/json", headers=STATIC_HEADERS)
+
+LENGTHS_PAYLOAD = orjson.dumps({
+    "lengths": [
+        {
+            "key": ContentLength.SHORT,
+            "name": "Short",
+            "description": LENGTH_GUIDELINES[ContentLength.SHORT]["description"]
+        },
+        {
+            "key": ContentLength.MEDIUM,
+            "name": "Medium",
+            "description": LENGTH_GUIDELINES[ContentLength.MEDIUM]["description"]
+        },
+        {
+            "key": ContentLength.LONG,
+            "name": "Long",
+            "description": LENGTH_GUIDELINES[ContentLength.LONG]["description"]
+        }
+    ]
+})
 
 @app.get("/lengths")
 async def get_content_lengths():
     """Get available content lengths and their descriptions"""
-    return {
-        "lengths": [
-            {
-                "key": ContentLength.SHORT,
-                "name": "Short",
-                "description": LENGTH_GUIDELINES[ContentLength.SHORT]["description"]
-            },
-            {
-                "key": ContentLength.MEDIUM,
-                "name": "Medium",
-                "description": LENGTH_GUIDELINES[ContentLength.MEDIUM]["description"]
-            },
-            {
-                "key": ContentLength.LONG,
-                "name": "Long",
-                "description": LENGTH_GUIDELINES[ContentLength.LONG]["description"]
-            }
-        ]
-    }
+    return Response(LENGTHS_PAYLOAD, media_type="application/json", headers=STATIC_HEADERS)
 
 # Background task functions
-async def log_operation_success(operation: str, details: Dict):
-    """Log successful AI operation"""
-    logger.info(f"{operation} success: {details}")
+OPERATION_LOG_QUEUE_SIZE = 10000
+OPERATION_LOG_BATCH_SIZE = 100
+dropped_operation_logs = 0
+
+def format_operation_log(operation: str, details: Dict) -> str:
+    return f"{operation} success: {orjson.dumps(details).decode()}"
+
+def log_operation_success(operation: str, details: Dict):
+    """Queue a successful AI operation for the background log writer, dropping it if the queue is full"""
+    global dropped_operation_logs
+    queue = getattr(app.state, "operation_log_queue", None)
+    if queue is None:
+        # Outside the app's lifespan there is no writer, so write the record straight away
+        logger.info(format_operation_log(operation, details))
+        return
+    try:
+        queue.put_nowait((operation, details))
+    except asyncio.QueueFull:
+        dropped_operation_logs += 1
+
+async def write_operation_logs(queue: asyncio.Queue):
+    """Drain queued operation records in batches, writing each batch with a single log call; None stops the writer"""
+    global dropped_operation_logs
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < OPERATION_LOG_BATCH_SIZE and not queue.empty():
+            batch.append(queue.get_nowait())
+        
+        lines = [format_operation_log(*record) for record in batch if record is not None]
+        if dropped_operation_logs:
+            lines.append(f"{dropped_operation_logs} operation log records dropped (queue full)")
+            dropped_operation_logs = 0
+        if lines:
+            logger.info("\n".join(lines))
+        if None in batch:
+            return
 
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return {
-        "error": exc.detail,
-        "status_code": exc.status_code,
-        "timestamp": datetime.now().isoformat()
-    }
+    return ORJSONResponse(
+        {
+            "error": exc.detail,
+            "detail": exc.detail,
+            "status_code": exc.status_code,
+            "timestamp": iso_now_cached()
+        },
+        status_code=exc.status_code,
+        headers=getattr(exc, "headers", None)
+    )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     logger.error(f"Unhandled exception: {str(exc)}")
-    return {
-        "error": "Internal server error",
-        "message": "An unexpected error occurred",
-        "timestamp": datetime.now().isoformat()
-    }
+    return ORJSONResponse(
+        {
+            "error": "Internal server error",
+            "message": "An unexpected error occurred",
+            "timestamp": iso_now_cached()
+        },
+        status_code=500
+    )
 
 # CLI Interface (enhanced with content generation)
 class GroqChatbot:
     """Command-line chatbot interface with content generation"""
     
+    # Command patterns capture the option and the text in a single pass
+    _REPHRASE_RE = re.compile(r"rephrase\s+(?:(\S+)\s+(.+))?", re.DOTALL)
+    _GENERATE_RE = re.compile(r"generate\s+(?:(\S+)\s+(.+))?", re.DOTALL)
+    
     def __init__(self, api_key: str):
+        self.api_key = api_key
         self.client = Groq(api_key=api_key)
-        self.ai_service = GroqAIService(self.client)
+        # One event loop for the whole session keeps the async client's connections alive between commands
+        self._loop = asyncio.new_event_loop()
+        self.ai_service = self._loop.run_until_complete(self._create_service())
         self.messages = [
             {"role": "system", "content": "You are a helpful assistant with rephrasing and content generation capabilities."}
         ]
@@ -901,83 +2240,93 @@ class GroqChatbot:
         print("- Just type normally for regular chat")
         print()
         
-        while True:
-            user_input = input("You: ").strip()
-            
-            if user_input.lower() in {"exit", "quit"}:
-                print("Goodbye!")
-                break
-            
-            # Check for rephrase command
-            if user_input.startswith("rephrase "):
-                self.handle_rephrase_command(user_input)
-                continue
-            
-            # Check for generate command
-            if user_input.startswith("generate "):
-                self.handle_generate_command(user_input)
-                continue
-            
-            # Regular chat
-            self.handle_regular_chat(user_input)
+        try:
+            while True:
+                user_input = input("You: ").strip()
+                
+                if user_input.lower() in {"exit", "quit"}:
+                    print("Goodbye!")
+                    break
+                
+                # Check for rephrase command
+                if match := self._REPHRASE_RE.match(user_input):
+                    self.handle_rephrase_command(*match.groups())
+                    continue
+                
+                # Check for generate command
+                if match := self._GENERATE_RE.match(user_input):
+                    self.handle_generate_command(*match.groups())
+                    continue
+                
+                # Regular chat
+                self.handle_regular_chat(user_input)
+        finally:
+            self.close()
     
-    def handle_rephrase_command(self, command: str):
+    def close(self):
+        """Close the async client and the session's event loop"""
+        if self._loop.is_closed():
+            return
+        self._loop.run_until_complete(self.ai_service.client.close())
+        self._loop.close()
+    
+    def handle_rephrase_command(self, style: Optional[str], text: Optional[str]):
         """Handle rephrase commands"""
         try:
-            parts = command.split(" ", 2)
-            if len(parts) < 3:
+            if not text:
                 print("Usage: rephrase [style] [text]")
-                print("Styles: formal, casual, creative, concise")
+                print(f"Styles: {REPHRASE_STYLE_LIST}")
                 return
             
-            style = parts[1].lower()
-            text = parts[2]
+            style = style.lower()
             
-            if style not in [s.value for s in RephraseStyle]:
-                print(f"Invalid style. Available: {', '.join([s.value for s in RephraseStyle])}")
+            if style not in REPHRASE_STYLE_VALUES:
+                print(f"Invalid style. Available: {REPHRASE_STYLE_LIST}")
                 return
             
-            # Use asyncio to run the async rephrase method
-            result = asyncio.run(self.ai_service.rephrase_text(
-                text, RephraseStyle(style)
-            ))
+            # Run the async rephrase method on the session's event loop
+            result = self._loop.run_until_complete(
+                self.ai_service.rephrase_text(text, RephraseStyle(style))
+            )
             
             print(f"\nOriginal: {text}")
-            print(f"Rephrased ({style}): {result['rephrased_text']}")
-            print(f"Processing time: {result['processing_time']:.2f}s\n")
+            print(f"Rephrased ({style}): {result.rephrased_text}")
+            print(f"Processing time: {result.processing_time:.2f}s\n")
             
         except Exception as e:
             print(f"Error rephrasing: {str(e)}\n")
     
-    def handle_generate_command(self, command: str):
+    def handle_generate_command(self, content_type: Optional[str], prompt: Optional[str]):
         """Handle content generation commands"""
         try:
-            parts = command.split(" ", 2)
-            if len(parts) < 3:
+            if not prompt:
                 print("Usage: generate [type] [prompt]")
-                print("Types: new, continue, expand, brainstorm, outline, summarize")
+                print(f"Types: {CONTENT_TYPE_LIST}")
                 return
             
-            content_type = parts[1].lower()
-            prompt = parts[2]
+            content_type = content_type.lower()
             
-            if content_type not in [t.value for t in ContentGenerationType]:
-                print(f"Invalid type. Available: {', '.join([t.value for t in ContentGenerationType])}")
+            if content_type not in CONTENT_TYPE_VALUES:
+                print(f"Invalid type. Available: {CONTENT_TYPE_LIST}")
                 return
             
-            # Use asyncio to run the async generate method
-            result = asyncio.run(self.ai_service.generate_content(
-                prompt, ContentGenerationType(content_type)
-            ))
+            # Run the async generate method on the session's event loop
+            result = self._loop.run_until_complete(
+                self.ai_service.generate_content(prompt, ContentGenerationType(content_type))
+            )
             
             print(f"\nPrompt: {prompt}")
             print(f"Generated content ({content_type}):")
-            print(f"{result['generated_content']}")
-            print(f"Processing time: {result['processing_time']:.2f}s\n")
+            print(f"{result.generated_content}")
+            print(f"Processing time: {result.processing_time:.2f}s\n")
             
         except Exception as e:
             print(f"Error generating content: {str(e)}\n")
     
+    async def _create_service(self) -> GroqAIService:
+        """Create the AI service inside the session loop so its client and locks belong to it"""
+        return GroqAIService(create_groq_client(self.api_key))
+    
     def handle_regular_chat(self, user_input: str):
         """Handle regular chat messages"""
         try:
@@ -1000,11 +2349,24 @@ class GroqChatbot:
 if __name__ == "__main__":
     import argparse
     
+    # uvloop is not available on Windows; fall back to the default asyncio loop there
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+    UVICORN_LOOP = "uvloop" if uvloop else "asyncio"
+    
     parser = argparse.ArgumentParser(description="Groq AI Content & Rephrase Service")
     parser.add_argument("--mode", choices=["server", "chat"], default="server", help="Run mode")
     parser.add_argument("--host", default="0.0.0.0", help="Server host")
     parser.add_argument("--port", default=8000, type=int, help="Server port")
     parser.add_argument("--reload", action="store_true", help="Enable auto-reload")
+    parser.add_argument(
+        "--workers",
+        default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        type=int,
+        help="Server worker processes (ignored with --reload)"
+    )
     
     args = parser.parse_args()
     
@@ -1018,17 +2380,29 @@ if __name__ == "__main__":
         print("Available endpoints:")
         print("  - POST /rephrase: Rephrase text")
         print("  - POST /generate-content: Generate new content")
+        print("  - POST /rephrase/stream: Rephrase text as Server-Sent Events")
+        print("  - POST /generate-content/stream: Generate content as Server-Sent Events")
         print("  - GET /styles: Get rephrase styles")
         print("  - GET /content-types: Get content generation types")
         print("  - GET /tones: Get content tones")
         print("  - GET /lengths: Get content lengths")
         print("  - GET /health: Health check")
+        # Auto-reload needs a single process
+        workers = 1 if args.reload else args.workers
+        # Worker processes import the app afresh and read this to take their share of the token budget
+        os.environ["GROQ_WORKER_COUNT"] = str(workers)
         uvicorn.run(
             "main:app",  # Adjust this if your file is named differently
             host=args.host,
             port=args.port,
-            reload=args.reload
+            reload=args.reload,
+            workers=workers,
+            loop=UVICORN_LOOP,
+            http="httptools"
         )
     elif args.mode == "chat":
+        # The chat commands run their async service calls on uvloop too
+        if uvloop:
+            uvloop.install()
         chatbot = GroqChatbot(GROQ_API_KEY)
         chatbot.chat()
\ No newline at end of file
@@ -0,0 +1,458 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+def make_service(create) -> main.GroqAIService:
+    """Build a service whose Groq client calls `create` for every completion"""
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return main.GroqAIService(client)
+
+
+class FakeStream:
+    """Stand-in for groq's AsyncStream over an async generator of chunks"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+
+    def __aiter__(self):
+        return self.chunks
+
+
+def delta(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def test_cancelled_probe_releases_half_open_breaker():
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang(**params):
+            started.set()
+            await asyncio.Event().wait()
+
+        service = make_service(hang)
+        # A zero cooldown makes the tripped breaker half open straight away
+        service.breaker = main.CircuitBreaker(threshold=1, cooldown=0)
+        service.breaker.record_failure()
+        assert service.breaker.state == "half_open"
+
+        probe = asyncio.create_task(service._complete(
+            model=service.model,
+            messages=[{"role": "user", "content": "hi"}],
+            max_tokens=10
+        ))
+        await started.wait()
+        assert service.breaker._probing
+
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        assert not service.breaker._probing
+        assert service.breaker.allow()
+
+    asyncio.run(scenario())
+
+
+def test_generate_content_stream_flag_is_not_compressed():
+    async def create(**params):
+        async def chunks():
+            for text in ["word "] * 500:
+                yield delta(text)
+        return FakeStream(chunks())
+
+    with TestClient(main.app) as client:
+        main.app.state.ai_service = make_service(create)
+        response = client.post(
+            "/generate-content",
+            json={"prompt": "cats", "stream": True},
+            headers={"Accept-Encoding": "br, gzip"}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+    assert response.text.count("word") == 500
+
+
+def test_batch_larger_than_backlog_is_413_not_429():
+    service = make_service(None)
+    limit = service.limiter.max_pending
+
+    with pytest.raises(main.HTTPException) as too_large:
+        service.raise_if_saturated(limit + 1)
+    assert too_large.value.status_code == 413
+
+    # Grouped items share calls, but the batch still counts against the item limit
+    with pytest.raises(main.HTTPException) as grouped:
+        service.raise_if_saturated(1, items=limit + 1)
+    assert grouped.value.status_code == 413
+
+    service.limiter.pending = limit
+    with pytest.raises(main.HTTPException) as busy:
+        service.raise_if_saturated(1)
+    assert busy.value.status_code == 429
+    assert busy.value.headers["Retry-After"] == "1"
+
+    service.limiter.pending = 0
+    service.raise_if_saturated(limit)
+
+
+def test_stream_holds_its_call_slot_until_closed():
+    async def scenario():
+        streams = []
+
+        async def create(**params):
+            async def chunks():
+                yield delta("Hello")
+                await asyncio.Event().wait()
+            streams.append(FakeStream(chunks()))
+            return streams[-1]
+
+        service = make_service(create)
+        service.limiter = main.GroqRateLimiter(concurrency=1, tokens_per_minute=1000)
+
+        events = main.sse_event_stream(service.rephrase_text_stream("hi"), "rephrase")
+        assert b"Hello" in await events.__anext__()
+        assert service.limiter._semaphore.locked()
+        assert service.limiter.pending == 1
+
+        # A client disconnect closes the event stream and the Groq response, and frees the slot;
+        # Groq has already billed the generated tokens, so the reservation is kept
+        await events.aclose()
+        assert streams[0].closed
+        assert not service.limiter._semaphore.locked()
+        assert service.limiter.pending == 0
+        service.limiter._refill()
+        assert service.limiter._tokens < 10
+
+    asyncio.run(scenario())
+
+
+def test_rephrase_texts_does_not_fall_back_after_a_timeout():
+    calls = []
+
+    async def create(**params):
+        calls.append(params)
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        service = make_service(create)
+        return await service.rephrase_texts(["first text", "second text", "third text"])
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert [result.status_code for result in results] == [504, 504, 504]
+
+
+def test_batch_chunks_stay_within_the_output_budget():
+    texts = ["x" * 5000] * 100
+    chunks = main.GroqAIService.batch_chunks(texts)
+
+    assert [i for chunk in chunks for i in chunk] == list(range(100))
+    for chunk in chunks:
+        assert len(chunk) <= main.BATCH_MAX_TEXTS
+        assert sum(len(texts[i]) // 4 + 1 for i in chunk) <= main.BATCH_MAX_INPUT_TOKENS
+    assert main.GroqAIService.batch_chunks(["short"] * 45) == [
+        list(range(0, 20)), list(range(20, 40)), list(range(40, 45))
+    ]
+
+
+def test_operation_logs_are_written_across_lifespans(caplog):
+    caplog.set_level("INFO", logger="main")
+
+    # Each TestClient session runs the lifespan on its own event loop
+    for session in range(2):
+        with TestClient(main.app):
+            main.log_operation_success("rephrase", {"session": session})
+
+    written = "\n".join(record.getMessage() for record in caplog.records)
+    assert 'rephrase success: {"session":0}' in written
+    assert 'rephrase success: {"session":1}' in written
+
+
+def test_stalled_stream_counts_as_an_upstream_failure():
+    async def scenario():
+        async def create(**params):
+            async def chunks():
+                yield delta("Hello")
+                raise httpx.ReadTimeout("stalled")
+            return FakeStream(chunks())
+
+        service = make_service(create)
+        service.breaker.failures = service.breaker.threshold - 1
+
+        fragments = service.rephrase_text_stream("hi")
+        with pytest.raises(httpx.ReadTimeout):
+            async for _ in fragments:
+                pass
+
+        assert service.breaker.failures == service.breaker.threshold
+        assert service.breaker.state == "open"
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_batch_stream_cancels_remaining_calls():
+    async def scenario():
+        finished = []
+
+        async def create(**params):
+            text = params["messages"][-1]["content"]
+            if "fast" not in text:
+                await asyncio.sleep(60)
+            finished.append(text)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content="rephrased"))],
+                usage=SimpleNamespace(total_tokens=5)
+            )
+
+        service = make_service(create)
+        http_request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(ai_service=service)))
+        requests = [main.RephraseRequest(text="fast")] + [
+            main.RephraseRequest(text=f"slow {i}") for i in range(5)
+        ]
+
+        response = await main.rephrase_batch_stream(requests, http_request)
+        lines = response.body_iterator
+        assert b'"index":0' in await lines.__anext__()
+
+        # The client goes away after the first line
+        await lines.aclose()
+        assert len(finished) == 1
+        assert service.limiter.pending == 0
+        assert not service.limiter._semaphore.locked()
+
+    asyncio.run(scenario())
+
+
+def test_errors_unrelated_to_upstream_health_do_not_reset_the_breaker():
+    async def scenario():
+        async def create(**params):
+            request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+            raise main.APIStatusError(
+                "rate limited",
+                response=httpx.Response(429, request=request),
+                body=None
+            )
+
+        service = make_service(create)
+        service.breaker = main.CircuitBreaker(threshold=2, cooldown=0)
+        service.breaker.record_failure()
+        service.breaker.record_failure()
+        assert service.breaker.state == "half_open"
+
+        with pytest.raises(main.APIStatusError):
+            await service._complete(
+                model=service.model,
+                messages=[{"role": "user", "content": "hi"}],
+                max_tokens=10
+            )
+
+        # The probe is given back, but the breaker stays half open with its failures intact
+        assert service.breaker.state == "half_open"
+        assert service.breaker.failures == 2
+        assert service.breaker.allow()
+
+    asyncio.run(scenario())
+
+
+def test_trickling_stream_is_cut_off_at_the_overall_deadline(monkeypatch):
+    monkeypatch.setattr(main, "GROQ_STREAM_TIMEOUT", 0.1)
+
+    async def scenario():
+        async def create(**params):
+            async def chunks():
+                # Each chunk arrives well within the read timeout, but the stream never ends
+                while True:
+                    await asyncio.sleep(0.01)
+                    yield delta("word ")
+            return FakeStream(chunks())
+
+        service = make_service(create)
+        with pytest.raises(main.HTTPException) as timed_out:
+            async for _ in service.generate_content_stream("cats"):
+                pass
+
+        assert timed_out.value.status_code == 504
+        assert service.breaker.failures == 1
+        assert service.limiter.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_template_cache_fingerprint_splits_out_numbers():
+    assert main.TemplateCache.fingerprint(" Order 12 ships in 3.5 days ") == (
+        "Order # ships in # days", ["12", "3.5"]
+    )
+
+
+def test_template_cache_needs_confirmations_before_answering():
+    cache = main.TemplateCache(confirmations=3, verify_every=100)
+    for _ in range(2):
+        cache.record("key", ["12", "3"], "Order 12 arrives in 3 days.")
+        assert cache.lookup("key", ["40", "7"]) is None
+
+    cache.record("key", ["12", "3"], "Order 12 arrives in 3 days.")
+    assert cache.lookup("key", ["40", "7"]) == "Order 40 arrives in 7 days."
+
+    # A different output template starts the confirmations over
+    cache.record("key", ["12", "3"], "In 3 days, order 12 arrives.")
+    assert cache.lookup("key", ["40", "7"]) is None
+
+
+def test_template_cache_asks_the_model_every_verify_every_hits():
+    cache = main.TemplateCache(confirmations=1, verify_every=3)
+    cache.record("key", ["5"], "Item 5.")
+    answers = [cache.lookup("key", ["9"]) for _ in range(6)]
+    assert answers == ["Item 9.", "Item 9.", None, "Item 9.", "Item 9.", None]
+
+
+def test_template_cache_skips_repeated_and_unmatched_numbers():
+    cache = main.TemplateCache(confirmations=1)
+    # The same number twice in the input cannot be mapped back unambiguously
+    cache.record("repeated", ["4", "4"], "Rooms 4 and 4.")
+    assert cache.lookup("repeated", ["1", "2"]) is None
+    # The model changed a number, so the output is not a template of the input
+    cache.record("changed", ["4"], "Room 5.")
+    assert cache.lookup("changed", ["1"]) is None
+
+
+def test_template_cache_escapes_braces_in_outputs():
+    cache = main.TemplateCache(confirmations=1)
+    cache.record("key", ["7"], "Use {name} and {7} here.")
+    assert cache.lookup("key", ["8"]) == "Use {name} and {8} here."
+
+
+def test_template_cache_entries_expire():
+    cache = main.TemplateCache(confirmations=1, ttl=-1)
+    cache.record("key", ["7"], "Room 7.")
+    assert cache.lookup("key", ["8"]) is None
+    assert "key" not in cache._entries
+
+
+def test_template_hits_are_reported_like_other_cache_hits():
+    async def create(**params):
+        text = params["messages"][-1]["content"]
+        number = main.TemplateCache.NUMBER_PATTERN.findall(text)[-1]
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"Please ship order {number}."))],
+            usage=SimpleNamespace(total_tokens=20)
+        )
+
+    async def scenario():
+        service = make_service(create)
+        service.template_cache = main.TemplateCache(confirmations=1)
+        await service.rephrase_text("ship order 41")
+        return await service.rephrase_text("ship order 42")
+
+    result = asyncio.run(scenario())
+    assert result.rephrased_text == "Please ship order 42."
+    assert result.cached
+    assert result.processing_time == 0.0
+    assert result.tokens_used == 0
+
+
+def test_token_bucket_refills_over_time():
+    limiter = main.GroqRateLimiter(tokens_per_minute=600)
+    limiter._tokens = 0
+    limiter._updated_at -= 1
+    limiter._refill()
+    assert 9 <= limiter._tokens <= 11
+
+    # Refill never exceeds the budget
+    limiter._updated_at -= 3600
+    limiter._refill()
+    assert limiter._tokens == 600
+
+
+def test_token_bucket_refunds_unused_tokens_and_debits_overage():
+    async def scenario():
+        limiter = main.GroqRateLimiter(tokens_per_minute=60000)
+
+        async with limiter.acquire(1000) as reservation:
+            reservation.used = 400
+        assert 59600 <= limiter._tokens <= 59610
+
+        async with limiter.acquire(1000) as reservation:
+            reservation.used = 3000
+        assert 56600 <= limiter._tokens <= 56620
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_grants_waiters_in_arrival_order():
+    async def scenario():
+        limiter = main.GroqRateLimiter(tokens_per_minute=6000)
+        limiter._tokens = 0
+        granted = []
+
+        async def reserve(name, tokens):
+            await limiter._reserve(tokens)
+            granted.append(name)
+
+        # The larger request arrives first, so the smaller one must wait behind it
+        first = asyncio.create_task(reserve("first", 10))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(reserve("second", 1))
+        await asyncio.gather(first, second)
+
+        assert granted == ["first", "second"]
+
+    asyncio.run(scenario())
+
+
+def batched_or_single_reply(calls, batched_content):
+    """Groq stand-in answering the JSON-mode batch call with `batched_content` and single calls normally"""
+    async def create(**params):
+        calls.append(params)
+        content = batched_content if "response_format" in params else "rephrased"
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(total_tokens=5)
+        )
+    return create
+
+
+def test_unparseable_batch_reply_falls_back_to_single_calls():
+    calls = []
+
+    async def scenario():
+        service = make_service(batched_or_single_reply(calls, "not json"))
+        return await service.rephrase_texts(["first text", "second text", "third text"])
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 4
+    assert [result.rephrased_text for result in results] == ["rephrased"] * 3
+
+
+def test_batch_fallback_is_refused_when_the_backlog_is_full():
+    calls = []
+
+    async def scenario():
+        service = make_service(batched_or_single_reply(calls, "not json"))
+        # Other requests already hold most of the backlog
+        service.limiter.max_pending = 10
+        service.limiter.pending = 8
+        return await service.rephrase_texts(["first text", "second text", "third text"])
+
+    results = asyncio.run(scenario())
+
+    # Only the batched call went out; the three fallback calls would overrun the backlog
+    assert len(calls) == 1
+    assert [result.status_code for result in results] == [429, 429, 429]